@@ -0,0 +1,116 @@
+import asyncio
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class InvoiceBatcher:
+    """Agrupa solicitudes de emisión concurrentes en un único FECAESolicitar.
+
+    Cada llamada a submit() encola la solicitud junto a un Future; un worker en
+    segundo plano junta hasta max_batch solicitudes (o las que lleguen dentro de
+    flush_interval_ms desde la primera) y las envía en un solo lote a AFIP.
+
+    Un comprobante rechazado no afecta a los demás: create_invoices_batch reenvía
+    renumerados los que AFIP rechazó solo por perder la correlatividad y devuelve una
+    respuesta por solicitud, conservando los CAE ya emitidos aunque falle una llamada
+    posterior. Solo se reenvían por separado los que volvieron con status "E" (Errors
+    generales de AFIP, que no autorizan nada de esa llamada), para que el error llegue
+    únicamente a quien lo provocó; los "I" (sin respuesta) nunca se reenvían, porque
+    podrían estar autorizados y se duplicarían.
+    """
+
+    def __init__(self, client_factory, max_batch=250, flush_interval_ms=50):
+        self.client_factory = client_factory
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = None
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._worker())
+        logger.info("Batcher de emisión iniciado")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Batcher de emisión detenido")
+
+    async def submit(self, invoice_request):
+        if not self.running:
+            # Sin worker activo (p. ej. fuera del lifespan) se emite directamente
+            responses = await asyncio.to_thread(self.client_factory().create_invoices_batch, [invoice_request])
+            return responses[0]
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((invoice_request, future))
+        return await future
+
+    async def _collect(self):
+        # Bloquea hasta la primera solicitud y luego junta las que lleguen en la ventana
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _worker(self):
+        while True:
+            batch = await self._collect()
+            requests = [invoice_request for invoice_request, _ in batch]
+
+            try:
+                responses = await asyncio.to_thread(self.client_factory().create_invoices_batch, requests)
+            except Exception as e:
+                # create_invoices_batch solo lanza si falla antes de enviar algo a AFIP
+                logger.exception("Error al emitir lote de %d facturas", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            # Un error general de AFIP ("E") puede deberse a otra solicitud del lote; esos
+            # comprobantes seguro no se autorizaron y se reenvían solos
+            reenviar = []
+            for (invoice_request, future), response in zip(batch, responses):
+                if response.status == "E" and len(batch) > 1:
+                    reenviar.append((invoice_request, future))
+                elif not future.done():
+                    future.set_result(response)
+
+            if reenviar:
+                logger.warning("AFIP rechazó %d de %d facturas del lote; se emiten por separado", len(reenviar), len(batch))
+                await self._emit_individually(reenviar)
+
+    async def _emit_individually(self, batch):
+        for invoice_request, future in batch:
+            try:
+                responses = await asyncio.to_thread(self.client_factory().create_invoices_batch, [invoice_request])
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(responses[0])
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-import json
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select, tuple_, cast, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import threading
+import orjson
+from functools import lru_cache
 from datetime import datetime
-from fastapi.responses import FileResponse
+from io import BytesIO
+from fastapi.responses import ORJSONResponse
 from src.utils.pdf_generator import FacturaPDF 
 
 from src.database.database import get_db
@@ -16,456 +23,539 @@ from src.schemas.factura import (
     ParametroAFIPSchema
 )
 from src.core.client import AfipClient
-from src.core.models import InvoiceRequest, VatDetail, TributeDetail
+from src.core.models import InvoiceRequest
+from src.core.exceptions import AfipError, AfipTimeoutError
 from src.config import Config
 from src.utils.logger import setup_logger
+from src.utils.cache import TTLCache
+from src.utils.http import get_shared_session
+from src.api.batcher import InvoiceBatcher
 
 logger = setup_logger(__name__)
 
 router = APIRouter(prefix="/api/facturas", tags=["facturas"])
 
-def get_afip_client():
-    """Obtiene una instancia del cliente AFIP"""
+_afip_client_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _afip_client():
+    """Construye el cliente AFIP una sola vez por proceso"""
     afip_config = Config.AFIP_CONFIG
     return AfipClient(
         cuit=afip_config["cuit"],
         cert_path=afip_config["cert_path"],
         key_path=afip_config["key_path"],
-        testing=afip_config["testing"]
+        testing=afip_config["testing"],
+        session=get_shared_session()
+    )
+
+
+def get_afip_client():
+    """Obtiene la instancia compartida del cliente AFIP"""
+    with _afip_client_lock:
+        return _afip_client()
+
+
+invoice_batcher = InvoiceBatcher(
+    get_afip_client,
+    max_batch=Config.BATCH_MAX_SIZE,
+    flush_interval_ms=Config.BATCH_FLUSH_MS
+)
+
+
+_afip_semaphore = asyncio.Semaphore(Config.AFIP_MAX_CONCURRENCY)
+
+
+async def _afip_call(func, *args):
+    """Ejecuta una llamada bloqueante a AFIP en un thread, limitando la concurrencia saliente"""
+    async with _afip_semaphore:
+        return await asyncio.to_thread(func, *args)
+
+
+_parametros_cache = TTLCache(ttl=Config.PARAMS_CACHE_TTL, maxsize=16)
+
+
+# Último número autorizado por (punto de venta, tipo); se actualiza con cada emisión propia
+# y el TTL acota el desfase si se emite por fuera de esta API
+_ultimo_cbte_cache = TTLCache(ttl=Config.LAST_VOUCHER_CACHE_TTL, maxsize=256)
+
+
+def _registrar_ultimo_cbte(punto_venta, tipo_cbte, numero):
+    key = (punto_venta, tipo_cbte)
+    actual = _ultimo_cbte_cache.get(key)
+    if actual is None or numero > actual:
+        _ultimo_cbte_cache.set(key, numero)
+
+
+# JSON ya serializado de cada catálogo junto con su ETag
+_parametros_body_cache = TTLCache(ttl=Config.PARAMS_CACHE_TTL, maxsize=16)
+
+
+async def _cached_body(request, key, builder):
+    """Responde un catálogo desde su JSON cacheado, o 304 si el cliente ya tiene esa versión"""
+    cached = _parametros_body_cache.get(key)
+    if cached is None:
+        body = orjson.dumps(await builder())
+        cached = (f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"', body)
+        _parametros_body_cache.set(key, cached)
+    etag, body = cached
+    headers = {"ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _cached(key, loader):
+    """Devuelve el resultado cacheado de un parámetro AFIP o lo consulta fuera del event loop"""
+    value = _parametros_cache.get(key)
+    if value is None:
+        value = await _afip_call(loader)
+        _parametros_cache.set(key, value)
+    return value
+
+
+def _build_invoice_request(factura_data):
+    """Convierte el esquema de la API al modelo de solicitud AFIP"""
+    # Los nombres de campo coinciden (y los detalles aceptan alias en minúscula),
+    # así que se valida directo desde los atributos sin copiar campo por campo
+    return InvoiceRequest.model_validate(factura_data, from_attributes=True)
+
+
+def _build_factura_db(factura_data, invoice_response):
+    """Arma la entidad Factura a persistir a partir de la solicitud y la respuesta de AFIP"""
+    return Factura(**_factura_row(factura_data, invoice_response))
+
+
+def _factura_row(factura_data, invoice_response):
+    """Valores de columna de la factura a persistir (sirve al ORM y al INSERT masivo)"""
+    return dict(
+        tipo_cbte=factura_data.voucher_type,
+        punto_vta=factura_data.sales_point,
+        numero=invoice_response.voucher_number,
+        fecha_cbte=invoice_response.voucher_date,
+        concepto=factura_data.concept,
+        tipo_doc=factura_data.doc_type,
+        nro_doc=factura_data.doc_number,
+        cantidad=factura_data.cantidad,
+        unidad_medida=factura_data.unidad_medida,
+        precio_unitario=factura_data.precio_unitario,
+        alicuota_iva=factura_data.alicuota_iva,
+        imp_total=factura_data.total_amount,
+        imp_neto=factura_data.net_amount,
+        imp_iva=factura_data.vat_amount,
+        imp_trib=factura_data.tributes_amount,
+        imp_op_ex=factura_data.exempt_amount,
+        imp_tot_conc=factura_data.non_taxable_amount,
+        cae=invoice_response.cae,
+        fecha_vto_cae=invoice_response.cae_expiration,
+        estado=invoice_response.status,
+
+        observaciones=invoice_response.observations,
+        viaje_id=factura_data.viaje_id,
+
+        detalles_iva=factura_data.vat_details,
+        detalles_tributos=factura_data.tributes_details,
+        moneda=factura_data.currency,
+        moneda_cotiz=factura_data.currency_rate,
+
+        condicion_iva_receptor_id=factura_data.condicion_iva_receptor_id,
+        can_mis_mon_ext=factura_data.can_mis_mon_ext,
+        descripcion=factura_data.description,
+        pdf_generado=False
     )
 
 
 @router.post("/emitir", response_model=FacturaResponseSchema, status_code=status.HTTP_201_CREATED)
-async def emitir_factura(factura_data: FacturaRequestSchema, db: Session = Depends(get_db), afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        # Convertir los detalles de IVA y tributos al formato del modelo
-        vat_details = None
-        if factura_data.vat_details:
-            vat_details = [
-                VatDetail(
-                    Id=vat.id,
-                    BaseImp=vat.base_imp,
-                    Importe=vat.importe
-                )
-                for vat in factura_data.vat_details
-            ]
-        
-        tributes_details = None
-        if factura_data.tributes_details:
-            tributes_details = [
-                TributeDetail(
-                    Id=trib.id,
-                    Desc=trib.desc,
-                    BaseImp=trib.base_imp,
-                    Alic=trib.alic,
-                    Importe=trib.importe
-                )
-                for trib in factura_data.tributes_details
-            ]
-        
-        # Crear request para AFIP
-        invoice_request = InvoiceRequest(
-            sales_point=factura_data.sales_point,
-            voucher_type=factura_data.voucher_type,
-            concept=factura_data.concept,
-            doc_type=factura_data.doc_type,
-            doc_number=factura_data.doc_number,
-            total_amount=factura_data.total_amount,
-            net_amount=factura_data.net_amount,
-            vat_amount=factura_data.vat_amount,
-            non_taxable_amount=factura_data.non_taxable_amount,
-            exempt_amount=factura_data.exempt_amount,
-            tributes_amount=factura_data.tributes_amount,
-            service_start_date=factura_data.service_start_date,
-            service_end_date=factura_data.service_end_date,
-            payment_due_date=factura_data.payment_due_date,
-            currency=factura_data.currency,
-            currency_rate=factura_data.currency_rate,
-            vat_details=vat_details,
-            tributes_details=tributes_details,
-            condicion_iva_receptor_id=factura_data.condicion_iva_receptor_id,
-            can_mis_mon_ext=factura_data.can_mis_mon_ext
-        )
-        
-        # Crear factura en AFIP
-        invoice_response = afip_client.create_invoice(invoice_request)
-        
-        if not invoice_response.is_approved:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"La factura fue rechazada por AFIP. Observaciones: {invoice_response.observations}"
-            )
-        
-        # Preparar datos para JSON
-        detalles_iva_json = None
-        if factura_data.vat_details:
-            # Convertimos cada campo Decimal a float explícitamente
-            detalles_iva_json = json.dumps([
-                {
-                    'id': v.id,
-                    'base_imp': float(v.base_imp), 
-                    'importe': float(v.importe)
-                } 
-                for v in factura_data.vat_details
-            ])
-
-        detalles_tributos_json = None
-        if factura_data.tributes_details:
-            detalles_tributos_json = json.dumps([
-                {
-                    'id': t.id,
-                    'desc': t.desc,
-                    'base_imp': float(t.base_imp),
-                    'alic': float(t.alic),
-                    'importe': float(t.importe)
-                }
-                for t in factura_data.tributes_details
-            ])
-        
-        # Guardar factura en la base de datos
-        factura_db = Factura(
-            tipo_cbte=factura_data.voucher_type,
-            punto_vta=factura_data.sales_point,
-            numero=invoice_response.voucher_number,
-            fecha_cbte=invoice_response.voucher_date,
-            concepto=factura_data.concept,
-            tipo_doc=factura_data.doc_type,
-            nro_doc=factura_data.doc_number,
-            cantidad=factura_data.cantidad,
-            unidad_medida=factura_data.unidad_medida,
-            precio_unitario=factura_data.precio_unitario,
-            alicuota_iva=factura_data.alicuota_iva,
-            imp_total=factura_data.total_amount,
-            imp_neto=factura_data.net_amount,
-            imp_iva=factura_data.vat_amount,
-            imp_trib=factura_data.tributes_amount,
-            imp_op_ex=factura_data.exempt_amount,
-            imp_tot_conc=factura_data.non_taxable_amount,
-            cae=invoice_response.cae,
-            fecha_vto_cae=invoice_response.cae_expiration,
-            estado=invoice_response.status,
-
-            observaciones=json.dumps(invoice_response.observations) if invoice_response.observations else None,
-            viaje_id=factura_data.viaje_id,
-
-            detalles_iva=detalles_iva_json,
-            detalles_tributos=detalles_tributos_json,
-            moneda=factura_data.currency,
-            moneda_cotiz=factura_data.currency_rate,
-
-            condicion_iva_receptor_id=factura_data.condicion_iva_receptor_id,
-            can_mis_mon_ext=factura_data.can_mis_mon_ext,
-            descripcion=factura_data.description,
-            pdf_generado=False
-        )
-        
-        db.add(factura_db)
-        db.commit()
-        db.refresh(factura_db)
-        
-        logger.info(f"Factura {factura_db.numero} emitida exitosamente con CAE: {factura_db.cae}")
-        
-        return factura_db
-        
-    except Exception as e:
-        logger.error(f"Error al emitir factura: {str(e)}")
-        db.rollback()
+async def emitir_factura(factura_data: FacturaRequestSchema, db: AsyncSession = Depends(get_db)):
+    # Crear request para AFIP
+    invoice_request = _build_invoice_request(factura_data)
+    
+    # Crear factura en AFIP (agrupada con otras emisiones concurrentes)
+    invoice_response = await invoice_batcher.submit(invoice_request)
+    
+    # Sin resultado propio de AFIP: se informa como falla del servicio externo
+    if invoice_response.status == "I":
+        raise AfipTimeoutError(invoice_response.errors[0])
+    if invoice_response.status == "E":
+        raise AfipError(invoice_response.errors[0])
+    
+    if not invoice_response.is_approved:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al emitir factura: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"La factura fue rechazada por AFIP. Observaciones: {invoice_response.observations}"
         )
+    
+    # Guardar factura en la base de datos
+    factura_db = _build_factura_db(factura_data, invoice_response)
+    _registrar_ultimo_cbte(factura_data.sales_point, factura_data.voucher_type, invoice_response.voucher_number)
+    
+    # El INSERT ya devuelve el id (RETURNING) y los defaults son del lado de Python;
+    # con expire_on_commit=False no hace falta el SELECT extra de refresh()
+    db.add(factura_db)
+    await db.commit()
+    
+    logger.info("Factura %s emitida exitosamente con CAE: %s", factura_db.numero, factura_db.cae)
+    
+    return factura_db
+
+
+@router.post("/emitir/bulk", response_model=dict, status_code=status.HTTP_201_CREATED)
+async def emitir_facturas_bulk(items: List[FacturaRequestSchema], db: AsyncSession = Depends(get_db), afip_client: AfipClient = Depends(get_afip_client)):
+    invoice_requests = [_build_invoice_request(factura_data) for factura_data in items]
+    
+    # Una sola solicitud FECAESolicitar por punto de venta y tipo de comprobante; si falla
+    # una llamada intermedia se devuelve igual lo ya autorizado para no perder esos CAE
+    invoice_responses = await _afip_call(afip_client.create_invoices_batch, invoice_requests)
+    
+    rows = [
+        _factura_row(factura_data, invoice_response) if invoice_response.is_approved else None
+        for factura_data, invoice_response in zip(items, invoice_responses)
+    ]
+    
+    for row in rows:
+        if row is not None:
+            _registrar_ultimo_cbte(row["punto_vta"], row["tipo_cbte"], row["numero"])
+    
+    # Un único INSERT multi-fila (Core, sin unit of work del ORM) en una sola transacción;
+    # un CAE ya guardado (reintento del lote) no se duplica
+    ids_por_cae = {}
+    approved = [row for row in rows if row is not None]
+    if approved:
+        result = await db.execute(
+            pg_insert(Factura).on_conflict_do_nothing(index_elements=[Factura.cae]).returning(Factura.id, Factura.cae),
+            approved
+        )
+        ids_por_cae = {cae: factura_id for factura_id, cae in result.all()}
+        await db.commit()
+    
+    responses = []
+    for row, invoice_response in zip(rows, invoice_responses):
+        if row is not None:
+            responses.append({"id": ids_por_cae.get(row["cae"]), "success": True, "cae": row["cae"]})
+        elif invoice_response.status in ("E", "I"):
+            # AFIP no dio un resultado propio para el comprobante (error del lote o sin respuesta)
+            responses.append({"id": None, "success": False, "error": invoice_response.errors[0]})
+        else:
+            responses.append({
+                "id": None,
+                "success": False,
+                "error": f"La factura fue rechazada por AFIP. Observaciones: {invoice_response.observations}"
+            })
+    
+    logger.info("Lote emitido: %d/%d facturas aprobadas", sum(r['success'] for r in responses), len(responses))
+    
+    return {"responses": responses}
+
+
+# Columnas de FacturaListSchema (evita traer los campos de texto pesados).
+# imp_total se castea en SQL para que orjson lo serialice sin pasar por Decimal.
+FACTURA_LIST_COLS = (
+    Factura.id,
+    Factura.tipo_cbte,
+    Factura.punto_vta,
+    Factura.numero,
+    Factura.fecha_cbte,
+    Factura.cae,
+    cast(Factura.imp_total, Float).label("imp_total"),
+    Factura.nro_doc,
+    Factura.estado,
+    Factura.fecha_creacion,
+)
 
 
-@router.get("/", response_model=List[FacturaListSchema])
-async def listar_facturas(skip: int = 0, limit: int = 50, viaje_id: Optional[int] = None, db: Session = Depends(get_db)):
-    try:
-        query = db.query(Factura)
-        
-        if viaje_id:
-            query = query.filter(Factura.viaje_id == viaje_id)
-        
-        facturas = query.order_by(Factura.fecha_creacion.desc()).offset(skip).limit(limit).all()
-        return facturas
-        
-    except Exception as e:
-        logger.error(f"Error al listar facturas: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al listar facturas: {str(e)}"
-        )
+@router.get("/", response_model=None, responses={200: {"model": List[FacturaListSchema]}})
+async def listar_facturas(
+    skip: int = 0,
+    limit: int = 50,
+    viaje_id: Optional[int] = None,
+    before_fecha: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    # Paginación por cursor: before_fecha/before_id son fecha_creacion e id del último
+    # elemento de la página anterior. skip se mantiene por compatibilidad.
+    query = select(*FACTURA_LIST_COLS)
+    
+    if viaje_id:
+        query = query.where(Factura.viaje_id == viaje_id)
+    
+    if before_fecha is not None and before_id is not None:
+        query = query.where(tuple_(Factura.fecha_creacion, Factura.id) < tuple_(before_fecha, before_id))
+    elif skip:
+        query = query.offset(skip)
+    
+    query = query.order_by(Factura.fecha_creacion.desc(), Factura.id.desc()).limit(limit)
+    rows = (await db.execute(query)).mappings().all()
+
+    # Si la página vino completa, se informa el cursor para pedir la siguiente
+    headers = None
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        headers = {
+            "X-Next-Before-Fecha": last["fecha_creacion"].isoformat(),
+            "X-Next-Before-Id": str(last["id"])
+        }
+    return ORJSONResponse([dict(row) for row in rows], headers=headers)
 
 
 @router.get("/{factura_id}", response_model=FacturaResponseSchema)
-async def obtener_factura(factura_id: int, db: Session = Depends(get_db)):
-    try:
-        factura = db.query(Factura).filter(Factura.id == factura_id).first()
-        
-        if not factura:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Factura no encontrada"
-            )
-        
-        return factura
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error al obtener factura: {str(e)}")
+async def obtener_factura(factura_id: int, db: AsyncSession = Depends(get_db)):
+    factura = (await db.execute(select(Factura).where(Factura.id == factura_id))).scalar_one_or_none()
+    
+    if not factura:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener factura: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Factura no encontrada"
         )
+    
+    return factura
 
 
 @router.post("/consultar", response_model=dict)
 async def consultar_factura_afip(consulta: FacturaConsultaSchema, afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        result = afip_client.check_invoice(
-            consulta.punto_vta,
-            consulta.tipo_cbte,
-            consulta.numero
+    result = await _afip_call(
+        afip_client.check_invoice,
+        consulta.punto_vta,
+        consulta.tipo_cbte,
+        consulta.numero
+    )
+    
+    return {
+        "success": True,
+        "data": {
+            "tipo_cbte": result.CbteTipo,
+            "punto_vta": result.PtoVta,
+            "numero": result.CbteNro,
+            "fecha_cbte": result.CbteFch,
+            "cae": result.CAE,
+            "fecha_vto_cae": result.FchVtoCAE,
+            "resultado": result.Resultado,
+            "imp_total": result.ImpTotal,
+            "imp_neto": result.ImpNeto,
+            "imp_iva": result.ImpIVA,
+        }
+    }
+
+
+def _str_or_none(value):
+    return str(value) if value is not None else None
+
+
+async def _param_tipos_comprobante(afip_client):
+    tipos = await _cached(("tipos_comprobante", afip_client.testing), afip_client.get_invoice_types)
+    return [
+        ParametroAFIPSchema(
+            tipo="tipo_comprobante",
+            codigo=str(tipo.Id),
+            descripcion=tipo.Desc,
+            datos_adicionales={"fecha_desde": _str_or_none(getattr(tipo, 'FchDesde', None))}
         )
-        
-        return {
-            "success": True,
-            "data": {
-                "tipo_cbte": result.CbteTipo,
-                "punto_vta": result.PtoVta,
-                "numero": result.CbteNro,
-                "fecha_cbte": result.CbteFch,
-                "cae": result.CAE,
-                "fecha_vto_cae": result.FchVtoCAE,
-                "resultado": result.Resultado,
-                "imp_total": result.ImpTotal,
-                "imp_neto": result.ImpNeto,
-                "imp_iva": result.ImpIVA,
+        for tipo in tipos
+    ]
+
+
+async def _param_puntos_venta(afip_client):
+    puntos = await _cached(("puntos_venta", afip_client.testing), afip_client.wsfe.get_sales_points)
+    return [
+        ParametroAFIPSchema(
+            tipo="punto_venta",
+            codigo=str(punto.Nro),
+            descripcion=f"Punto de venta {punto.Nro}",
+            datos_adicionales={
+                "bloqueado": getattr(punto, 'Bloqueado', False)
             }
-        }
-        
-    except Exception as e:
-        logger.error(f"Error al consultar factura en AFIP: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al consultar factura: {str(e)}"
         )
+        for punto in puntos
+    ]
+
+
+async def _param_tipos_documento(afip_client):
+    tipos = await _cached(("tipos_documento", afip_client.testing), afip_client.get_document_types)
+    return [
+        ParametroAFIPSchema(
+            tipo="tipo_documento",
+            codigo=str(tipo.Id),
+            descripcion=tipo.Desc,
+            datos_adicionales={"fecha_desde": _str_or_none(getattr(tipo, 'FchDesde', None))}
+        )
+        for tipo in tipos
+    ]
+
+
+async def _param_tipos_iva(afip_client):
+    tipos = await _cached(("tipos_iva", afip_client.testing), afip_client.get_vat_types)
+    resultado = []
+    for tipo in tipos:
+        alicuota = getattr(tipo, 'Alic', None)
+        resultado.append(ParametroAFIPSchema(
+            tipo="tipo_iva",
+            codigo=str(tipo.Id),
+            descripcion=tipo.Desc,
+            datos_adicionales={
+                "alicuota": float(alicuota) if alicuota is not None else None,
+                "fecha_desde": _str_or_none(getattr(tipo, 'FchDesde', None))
+            }
+        ))
+    return resultado
+
+
+async def _param_tipos_concepto(afip_client):
+    tipos = await _cached(("tipos_concepto", afip_client.testing), afip_client.get_concept_types)
+    return [
+        ParametroAFIPSchema(
+            tipo="tipo_concepto",
+            codigo=str(tipo.Id),
+            descripcion=tipo.Desc,
+            datos_adicionales={"fecha_desde": _str_or_none(getattr(tipo, 'FchDesde', None))}
+        )
+        for tipo in tipos
+    ]
+
+
+async def _param_condiciones_iva_receptor(afip_client):
+    condiciones = await _cached(("condiciones_iva_receptor", afip_client.testing), afip_client.wsfe.get_condicion_iva_receptor)
+    return [
+        ParametroAFIPSchema(
+            tipo="condicion_iva_receptor",
+            codigo=str(cond.Id),
+            descripcion=cond.Desc,
+            datos_adicionales={"clase_cmp": cond.Cmp_Clase}
+        )
+        for cond in condiciones.ResultGet.CondicionIvaReceptor
+    ]
 
 
-@router.get("/parametros/tipos-comprobante", response_model=List[ParametroAFIPSchema])
-async def obtener_tipos_comprobante(afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        tipos = afip_client.get_invoice_types()
-        return [
-            ParametroAFIPSchema(
-                tipo="tipo_comprobante",
-                codigo=str(tipo.Id),
-                descripcion=tipo.Desc,
-                datos_adicionales={"fecha_desde": str(tipo.FchDesde) if hasattr(tipo, 'FchDesde') else None}
-            )
-            for tipo in tipos
-        ]
-        
-    except Exception as e:
-        logger.error(f"Error al obtener tipos de comprobante: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener tipos de comprobante: {str(e)}"
-        )
+async def _todos_parametros(afip_client):
+    tipos_cbte, puntos, docs, ivas, conceptos = await asyncio.gather(
+        _param_tipos_comprobante(afip_client),
+        _param_puntos_venta(afip_client),
+        _param_tipos_documento(afip_client),
+        _param_tipos_iva(afip_client),
+        _param_tipos_concepto(afip_client)
+    )
+    return {
+        "tipos_comprobante": tipos_cbte,
+        "puntos_venta": puntos,
+        "tipos_documento": docs,
+        "tipos_iva": ivas,
+        "tipos_concepto": conceptos
+    }
 
 
-@router.get("/parametros/puntos-venta", response_model=List[ParametroAFIPSchema])
-async def obtener_puntos_venta(afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        puntos = afip_client.wsfe.get_sales_points()
-        return [
-            ParametroAFIPSchema(
-                tipo="punto_venta",
-                codigo=str(punto.Nro),
-                descripcion=f"Punto de venta {punto.Nro}",
-                datos_adicionales={
-                    "bloqueado": punto.Bloqueado if hasattr(punto, 'Bloqueado') else False
-                }
-            )
-            for punto in puntos
-        ]
-        
-    except Exception as e:
-        logger.error(f"Error al obtener puntos de venta: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener puntos de venta: {str(e)}"
-        )
+@router.get("/parametros/all", response_model=None, responses={200: {"model": Dict[str, List[ParametroAFIPSchema]]}})
+async def obtener_todos_parametros(request: Request, afip_client: AfipClient = Depends(get_afip_client)):
+    """Devuelve todo el catálogo consultando AFIP en paralelo"""
+    return await _cached_body(request, ("all", afip_client.testing), lambda: _todos_parametros(afip_client))
 
 
-@router.get("/parametros/tipos-documento", response_model=List[ParametroAFIPSchema])
-async def obtener_tipos_documento(afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        tipos = afip_client.get_document_types()
-        return [
-            ParametroAFIPSchema(
-                tipo="tipo_documento",
-                codigo=str(tipo.Id),
-                descripcion=tipo.Desc,
-                datos_adicionales={"fecha_desde": str(tipo.FchDesde) if hasattr(tipo, 'FchDesde') else None}
-            )
-            for tipo in tipos
-        ]
-        
-    except Exception as e:
-        logger.error(f"Error al obtener tipos de documento: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener tipos de documento: {str(e)}"
-        )
+@router.get("/parametros/tipos-comprobante", response_model=None, responses={200: {"model": List[ParametroAFIPSchema]}})
+async def obtener_tipos_comprobante(request: Request, afip_client: AfipClient = Depends(get_afip_client)):
+    return await _cached_body(request, ("tipos_comprobante", afip_client.testing), lambda: _param_tipos_comprobante(afip_client))
 
 
-@router.get("/parametros/tipos-iva", response_model=List[ParametroAFIPSchema])
-async def obtener_tipos_iva(afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        tipos = afip_client.get_vat_types()
-        return [
-            ParametroAFIPSchema(
-                tipo="tipo_iva",
-                codigo=str(tipo.Id),
-                descripcion=tipo.Desc,
-                datos_adicionales={
-                    "alicuota": float(tipo.Alic) if hasattr(tipo, 'Alic') else None,
-                    "fecha_desde": str(tipo.FchDesde) if hasattr(tipo, 'FchDesde') else None
-                }
-            )
-            for tipo in tipos
-        ]
-        
-    except Exception as e:
-        logger.error(f"Error al obtener tipos de IVA: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener tipos de IVA: {str(e)}"
-        )
+@router.get("/parametros/puntos-venta", response_model=None, responses={200: {"model": List[ParametroAFIPSchema]}})
+async def obtener_puntos_venta(request: Request, afip_client: AfipClient = Depends(get_afip_client)):
+    return await _cached_body(request, ("puntos_venta", afip_client.testing), lambda: _param_puntos_venta(afip_client))
 
 
-@router.get("/parametros/tipos-concepto", response_model=List[ParametroAFIPSchema])
-async def obtener_tipos_concepto(afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        tipos = afip_client.get_concept_types()
-        return [
-            ParametroAFIPSchema(
-                tipo="tipo_concepto",
-                codigo=str(tipo.Id),
-                descripcion=tipo.Desc,
-                datos_adicionales={"fecha_desde": str(tipo.FchDesde) if hasattr(tipo, 'FchDesde') else None}
-            )
-            for tipo in tipos
-        ]
-        
-    except Exception as e:
-        logger.error(f"Error al obtener tipos de concepto: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener tipos de concepto: {str(e)}"
-        )
+@router.get("/parametros/tipos-documento", response_model=None, responses={200: {"model": List[ParametroAFIPSchema]}})
+async def obtener_tipos_documento(request: Request, afip_client: AfipClient = Depends(get_afip_client)):
+    return await _cached_body(request, ("tipos_documento", afip_client.testing), lambda: _param_tipos_documento(afip_client))
+
+
+@router.get("/parametros/tipos-iva", response_model=None, responses={200: {"model": List[ParametroAFIPSchema]}})
+async def obtener_tipos_iva(request: Request, afip_client: AfipClient = Depends(get_afip_client)):
+    return await _cached_body(request, ("tipos_iva", afip_client.testing), lambda: _param_tipos_iva(afip_client))
+
+
+@router.get("/parametros/tipos-concepto", response_model=None, responses={200: {"model": List[ParametroAFIPSchema]}})
+async def obtener_tipos_concepto(request: Request, afip_client: AfipClient = Depends(get_afip_client)):
+    return await _cached_body(request, ("tipos_concepto", afip_client.testing), lambda: _param_tipos_concepto(afip_client))
+
+
+@router.post("/parametros/refresh", response_model=dict)
+@router.post("/parametros/_invalidate", response_model=dict)
+async def refrescar_parametros():
+    """Invalida la caché de parámetros AFIP"""
+    _parametros_cache.clear()
+    _parametros_body_cache.clear()
+    logger.info("Caché de parámetros AFIP invalidada")
+    return {"success": True}
 
 
 @router.get("/estado/servidores", response_model=dict)
 async def estado_servidores(afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        estado = afip_client.wsfe.check_server_status()
-        return {
-            "success": True,
-            "wsfe": {
-                "app_server": estado.get('app_server', 'Desconocido'),
-                "db_server": estado.get('db_server', 'Desconocido'),
-                "auth_server": estado.get('auth_server', 'Desconocido')
-            },
-            "modo": "homologación" if afip_client.testing else "producción"
-        }
-        
-    except Exception as e:
-        logger.error(f"Error al verificar estado de servidores: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al verificar estado: {str(e)}"
-        )
+    estado = await _afip_call(afip_client.wsfe.check_server_status)
+    return {
+        "success": True,
+        "wsfe": {
+            "app_server": estado.get('app_server', 'Desconocido'),
+            "db_server": estado.get('db_server', 'Desconocido'),
+            "auth_server": estado.get('auth_server', 'Desconocido')
+        },
+        "modo": "homologación" if afip_client.testing else "producción"
+    }
+
 
 @router.get("/parametros/cotizacion/{moneda_id}", response_model=dict)
 async def obtener_cotizacion(moneda_id: str, afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        # Accedemos directamente al servicio WSFE del cliente
-        client = afip_client.wsfe._get_client()
-        auth = afip_client.wsfe._get_auth()
+    cotizacion = await _afip_call(afip_client.wsfe.get_currency_rate, moneda_id)
         
-        result = client.service.FEParamGetCotizacion(Auth=auth, MonId=moneda_id)
-        
-        if hasattr(result, 'Errors') and result.Errors:
-            raise Exception(f"Error AFIP: {result.Errors}")
-            
-        return {
-            "moneda": result.ResultGet.MonId,
-            "importe": result.ResultGet.MonCotiz,
-            "fecha": str(result.ResultGet.FchCotiz)
-        }
-    except Exception as e:
-        logger.error(f"Error al obtener cotización: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "moneda": cotizacion.MonId,
+        "importe": cotizacion.MonCotiz,
+        "fecha": str(cotizacion.FchCotiz)
+    }
+
 
 @router.get("/ultimo-comprobante/{punto_venta}/{tipo_cbte}", response_model=dict)
 async def obtener_ultimo_comprobante(punto_venta: int, tipo_cbte: int, afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        ultimo = afip_client.get_last_invoice_number(punto_venta, tipo_cbte)
-        return {
-            "punto_venta": punto_venta,
-            "tipo_comprobante": tipo_cbte,
-            "ultimo_numero": ultimo
-        }
-    except Exception as e:
-        logger.error(f"Error consultando último comprobante: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/parametros/condiciones-iva-receptor", response_model=List[ParametroAFIPSchema])
-async def obtener_condiciones_iva_receptor(afip_client: AfipClient = Depends(get_afip_client)):
-    try:
-        condiciones = afip_client.wsfe.get_condicion_iva_receptor()
-        
-        return [
-            ParametroAFIPSchema(
-                tipo="condicion_iva_receptor",
-                codigo=str(cond.Id),
-                descripcion=cond.Desc,
-                datos_adicionales={"clase_cmp": cond.Cmp_Clase}
-            )
-            for cond in condiciones.ResultGet.CondicionIvaReceptor
-        ]
-    except Exception as e:
-        logger.error(f"Error obteniendo condiciones IVA: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    ultimo = _ultimo_cbte_cache.get((punto_venta, tipo_cbte))
+    if ultimo is None:
+        ultimo = await _afip_call(afip_client.get_last_invoice_number, punto_venta, tipo_cbte)
+        _registrar_ultimo_cbte(punto_venta, tipo_cbte, ultimo)
+    return {
+        "punto_venta": punto_venta,
+        "tipo_comprobante": tipo_cbte,
+        "ultimo_numero": ultimo
+    }
+
+
+@router.get("/parametros/condiciones-iva-receptor", response_model=None, responses={200: {"model": List[ParametroAFIPSchema]}})
+async def obtener_condiciones_iva_receptor(request: Request, afip_client: AfipClient = Depends(get_afip_client)):
+    return await _cached_body(request, ("condiciones_iva_receptor", afip_client.testing), lambda: _param_condiciones_iva_receptor(afip_client))
+
+
+# Nombres de columna de Factura, calculados una vez para armar el dict del PDF
+_FACTURA_COLS = tuple(c.name for c in Factura.__table__.columns)
+
+
+@lru_cache(maxsize=1)
+def get_pdf_generator():
+    """Generador de PDF compartido (estilos y logo se cargan una única vez)"""
+    return FacturaPDF({
+        'razon_social': Config.COMPANY_NAME,
+        'cuit': Config.AFIP_CONFIG['cuit'],
+        'domicilio': Config.COMPANY_ADDRESS
+    })
+
 
 @router.get("/{factura_id}/pdf")
-async def descargar_pdf(factura_id: int, db: Session = Depends(get_db)):
-    try:
-        factura = db.query(Factura).filter(Factura.id == factura_id).first()
-        if not factura:
-            raise HTTPException(status_code=404, detail="Factura no encontrada")
-
-        pdf_config = {
-            'pdf_output_dir': '/tmp',
-            'razon_social': Config.COMPANY_NAME,
-            'cuit': Config.AFIP_CONFIG['cuit'],
-            'domicilio': Config.COMPANY_ADDRESS
-        }
-        
-        # Generar PDF
-        pdf_gen = FacturaPDF(pdf_config)
-        
-        factura_dict = {c.name: getattr(factura, c.name) for c in factura.__table__.columns}
-        
-        path = pdf_gen.generar_pdf(factura_dict)
-        
-        return FileResponse(
-            path, 
-            media_type='application/pdf', 
-            filename=f"Factura_{factura.punto_vta}-{factura.numero}.pdf"
-        )
-        
-    except Exception as e:
-        logger.error(f"Error generando PDF: {e}")
-        raise HTTPException(status_code=500, detail=f"Error generando PDF: {str(e)}")
\ No newline at end of file
+async def descargar_pdf(factura_id: int, db: AsyncSession = Depends(get_db)):
+    factura = (await db.execute(select(Factura).where(Factura.id == factura_id))).scalar_one_or_none()
+    if not factura:
+        raise HTTPException(status_code=404, detail="Factura no encontrada")
+
+    pdf_gen = get_pdf_generator()
+    
+    factura_dict = {name: getattr(factura, name) for name in _FACTURA_COLS}
+    
+    # ReportLab es CPU-bound: se genera en un thread y directo a memoria
+    buffer = await asyncio.to_thread(pdf_gen.generar_pdf, factura_dict, BytesIO())
+    
+    return Response(
+        content=buffer.getvalue(),
+        media_type='application/pdf',
+        headers={"Content-Disposition": f'attachment; filename="Factura_{factura.punto_vta}-{factura.numero}.pdf"'}
+    )
\ No newline at end of file
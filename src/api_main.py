@@ -1,13 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import uvicorn
 from contextlib import asynccontextmanager
 from src.config import Config
-from src.api.routes import router as facturas_router
-from src.database.database import engine, Base
+from src.api.routes import router as facturas_router, invoice_batcher
+from src.database.database import engine, Base, create_missing_indexes, drop_obsolete_indexes, upgrade_json_columns
 from src.database import models 
 from src.utils.logger import setup_logger
+from src.utils.http import close_shared_session
+from src.core.exceptions import AfipError, AfipTimeoutError
 
 logger = setup_logger(__name__)
 
@@ -15,13 +17,22 @@ logger = setup_logger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(upgrade_json_columns)
+            await conn.run_sync(create_missing_indexes)
+            await conn.run_sync(drop_obsolete_indexes)
         logger.info("Tablas de base de datos creadas/verificadas")
-    except Exception as e:
-        logger.error(f"Error al crear tablas: {str(e)}")
+    except Exception:
+        logger.exception("Error al crear tablas")
+    
+    await invoice_batcher.start()
     
     yield
     
+    await invoice_batcher.stop()
+    await engine.dispose()
+    close_shared_session()
     logger.info("Cerrando aplicación")
 
 
@@ -29,15 +40,18 @@ app = FastAPI(
     title="API de Facturación Electrónica AFIP",
     description="API REST para generar facturas electrónicas a través del WebService SOAP de AFIP/ARCA",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=Config.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type", "If-None-Match"],
+    expose_headers=["ETag", "X-Next-Before-Fecha", "X-Next-Before-Id"],
+    max_age=Config.CORS_MAX_AGE,
 )
 
 app.include_router(facturas_router)
@@ -66,11 +80,25 @@ async def health_check():
     return {"status": "ok", "service": "facturacion"}
 
 
+@app.exception_handler(AfipTimeoutError)
+async def afip_timeout_handler(request, exc):
+    """AFIP no respondió: se informa como timeout del servicio externo"""
+    logger.error("Timeout de AFIP en %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(AfipError)
+async def afip_error_handler(request, exc):
+    """Errores informados por AFIP: se devuelven como falla del servicio externo"""
+    logger.error("Error de AFIP en %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse(status_code=502, content={"detail": str(exc)})
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    """Manejador global de excepciones"""
-    logger.error(f"Error no manejado: {str(exc)}")
-    return JSONResponse(
+    """Manejador global de excepciones: el detalle solo va al log, nunca al cliente"""
+    logger.error("Error no manejado en %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Error interno del servidor"}
     )
@@ -42,6 +42,23 @@ class Config:
     # Tiempo de expiración del token de autenticación (en segundos)
     TOKEN_TTL = int(os.getenv("TOKEN_TTL", "2400"))  # 40 minutos
 
+    # Tiempo de vida de la caché de parámetros AFIP (en segundos)
+    PARAMS_CACHE_TTL = int(os.getenv("PARAMS_CACHE_TTL", "3600"))  # 1 hora
+
+    # Tiempo de vida del último número de comprobante cacheado (en segundos)
+    LAST_VOUCHER_CACHE_TTL = int(os.getenv("LAST_VOUCHER_CACHE_TTL", "300"))  # 5 minutos
+
+    # Máximo de llamadas simultáneas a los web services de AFIP
+    AFIP_MAX_CONCURRENCY = int(os.getenv("AFIP_MAX_CONCURRENCY", "3"))
+
+    # Agrupamiento de emisiones concurrentes en un único FECAESolicitar
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "250"))
+    BATCH_FLUSH_MS = int(os.getenv("BATCH_FLUSH_MS", "50"))
+
+    # Orígenes permitidos por CORS, separados por coma ("*" para cualquiera)
+    CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
+    CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", "86400"))  # 24 horas
+
     # Configuración para facturación
     DEFAULT_SALES_POINT = int(os.getenv("DEFAULT_SALES_POINT", "1"))
 
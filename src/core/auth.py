@@ -1,8 +1,11 @@
 import os
-import pickle
+import time
+import asyncio
 import ctypes
-from datetime import datetime
-from requests import Session
+import threading
+import pickle
+import orjson
+from datetime import datetime, timedelta, timezone
 from zeep import Client
 from zeep.transports import Transport
 from urllib3.exceptions import InsecureRequestWarning
@@ -10,9 +13,11 @@ import requests
 
 from src.config import Config
 from src.utils.logger import setup_logger
+from src.utils.http import get_shared_session, get_wsdl_cache
 from src.utils.cert_utils import read_cert_and_key, sign_data
 from src.utils.xml_utils import create_tra_xml, parse_wsaa_response
 from src.core.models import AfipAuth
+from src.core.exceptions import AfipError, AfipTimeoutError
 
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
@@ -22,86 +27,239 @@ AFIP_CONFIG = Config.AFIP_CONFIG
 AFIP_URLS = Config.AFIP_URLS
 TOKEN_TTL = Config.TOKEN_TTL
 BASE_DIR = Config.BASE_DIR
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+
+# El directorio de caché por defecto se crea una sola vez al importar el módulo
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Tickets de acceso compartidos por todos los autenticadores del proceso;
+# el archivo en disco queda como respaldo entre workers y reinicios
+_auth_memory = {}
+_wsaa_clients = {}
+_wsaa_clients_lock = threading.Lock()
+
+# Un lock por ticket (servicio, entorno, CUIT): AFIP rechaza pedir un TA nuevo mientras
+# otro del mismo CUIT y servicio sigue vigente, pero CUITs distintos pueden autenticarse en paralelo
+_auth_locks = {}
+_auth_locks_guard = threading.Lock()
+
+def _get_auth_lock(key):
+    lock = _auth_locks.get(key)
+    if lock is None:
+        with _auth_locks_guard:
+            lock = _auth_locks.setdefault(key, threading.Lock())
+    return lock
+
+# Configuración de OpenSSL que habilita proveedores legacy; es estado global del proceso
+OPENSSL_CONF_PATH = os.path.join(BASE_DIR, 'src', 'config', 'openssl.cnf').encode('utf-8')
+_libcrypto = None
+_openssl_initialized = False
+_openssl_lock = threading.Lock()
+
+def _init_openssl_once():
+    global _libcrypto, _openssl_initialized
+    if _openssl_initialized:
+        return
+    with _openssl_lock:
+        if _openssl_initialized:
+            return
+        for lib_name in ("libcrypto.so.3", "libcrypto.so.1.1"):
+            try:
+                _libcrypto = ctypes.CDLL(lib_name)
+                _libcrypto.OPENSSL_config(OPENSSL_CONF_PATH)
+                break
+            except OSError:
+                logger.debug("No se encontró la librería '%s'. Intentando con la siguiente.", lib_name)
+                continue
+        _openssl_initialized = True
+
+class _LegacyTicket:
+    # Recibe el estado del AfipAuth (pydantic) pickleado sin reconstruir el modelo
+    def __setstate__(self, state):
+        self.data = state.get('__dict__', state)
+
+
+class _LegacyTicketUnpickler(pickle.Unpickler):
+    # Solo resuelve las clases que contiene un ticket pickleado; cualquier otra
+    # referencia se rechaza para no ejecutar código arbitrario desde el archivo
+    _ALLOWED = {
+        ('datetime', 'datetime'): datetime,
+        ('datetime', 'timezone'): timezone,
+        ('datetime', 'timedelta'): timedelta,
+        ('src.core.models', 'AfipAuth'): _LegacyTicket,
+    }
+
+    def find_class(self, module, name):
+        try:
+            return self._ALLOWED[(module, name)]
+        except KeyError:
+            raise pickle.UnpicklingError(f"Clase no permitida en la caché anterior: {module}.{name}") from None
+
 
 class AfipAuthenticator:
     
-    def __init__(self, cuit=None, cert_path=None, key_path=None, testing=None, cache_dir=None):
+    __slots__ = (
+        'session', 'cuit', 'cert_path', 'key_path', 'testing', 'cache_dir',
+        'wsaa_url', '_cache_suffix', '_cache_path_suffix'
+    )
+    
+    def __init__(self, cuit=None, cert_path=None, key_path=None, testing=None, cache_dir=None, session=None):
+        # Sin sesión inyectada se usa la compartida del proceso (pool keep-alive por host)
+        self.session = session or get_shared_session()
         self.cuit = cuit or AFIP_CONFIG["cuit"]
         self.cert_path = cert_path or AFIP_CONFIG["cert_path"]
         self.key_path = key_path or AFIP_CONFIG["key_path"]
         self.testing = testing if testing is not None else AFIP_CONFIG["testing"]
-        self.cache_dir = cache_dir or os.path.join(BASE_DIR, "cache")
+        self.cache_dir = cache_dir or CACHE_DIR
         
         # URL del servicio WSAA según el entorno
         self.wsaa_url = AFIP_URLS["wsaa"]["testing"] if self.testing else AFIP_URLS["wsaa"]["production"]
         
-        # Crear directorio de caché si no existe
-        if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
+        # Crear directorio de caché personalizado si no existe
+        if cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Sufijos de clave y archivo de caché, fijos para el entorno y CUIT
+        environment = "testing" if self.testing else "production"
+        self._cache_suffix = f"{environment}:{self.cuit}"
+        self._cache_path_suffix = f"_{environment}_{self.cuit}.json"
     
+    def _cache_key(self, service):
+        return f"afip:{service}:{self._cache_suffix}"
+
     def _get_cache_path(self, service):
 
         # Obtiene la ruta del archivo de caché para un servicio
-        environment = "testing" if self.testing else "production"
-        return os.path.join(self.cache_dir, f"{service}_{environment}_{self.cuit}.pkl")
+        return os.path.join(self.cache_dir, service + self._cache_path_suffix)
     
     def _load_auth_from_cache(self, service):
+        auth = _auth_memory.get(self._cache_key(service))
+        if auth is not None and auth.is_valid:
+            return auth
+
         cache_path = self._get_cache_path(service)
         
-        if not os.path.exists(cache_path):
-            return None
+        # El mtime del archivo guarda el vencimiento del ticket: un stat basta para descartarlo
+        try:
+            if os.stat(cache_path).st_mtime <= time.time():
+                return None
+        except FileNotFoundError:
+            return self._migrate_legacy_cache(service)
         
         try:
             with open(cache_path, 'rb') as f:
-                auth = pickle.load(f)
+                auth = AfipAuth(**orjson.loads(f.read()))
             
             # Verificar si expiró
             if auth.is_valid:
-                logger.info(f"Autenticación cargada desde caché para {service}")
+                logger.info("Autenticación cargada desde caché para %s", service)
+                _auth_memory[self._cache_key(service)] = auth
                 return auth
             else:
-                logger.info(f"Autenticación en caché expirada para {service}")
+                logger.info("Autenticación en caché expirada para %s", service)
                 return None
                 
+        except FileNotFoundError:
+            # Otro worker lo reemplazó o borró entre el stat y la lectura
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.error("Error al cargar autenticación desde caché: %s", e)
+            return None
+    
+    def _migrate_legacy_cache(self, service):
+        # Las versiones anteriores guardaban el ticket pickleado en {service}_{entorno}_{cuit}.pkl.
+        # Se lee una única vez y se reescribe en JSON: AFIP no emite otro TA mientras ese siga vigente
+        environment = "testing" if self.testing else "production"
+        legacy_path = os.path.join(self.cache_dir, f"{service}_{environment}_{self.cuit}.pkl")
+        
+        try:
+            with open(legacy_path, 'rb') as f:
+                data = _LegacyTicketUnpickler(f).load().data
+            auth = AfipAuth(
+                token=data['token'],
+                sign=data['sign'],
+                cuit=data['cuit'],
+                expiration_epoch=int(data['expiration'].timestamp())
+            )
+        except FileNotFoundError:
+            return None
         except Exception as e:
-            logger.error(f"Error al cargar autenticación desde caché: {str(e)}")
+            logger.error("Error al leer el ticket de la caché anterior %s: %s", legacy_path, e)
             return None
+        
+        try:
+            os.remove(legacy_path)
+        except OSError:
+            pass
+        
+        if not auth.is_valid:
+            return None
+        
+        logger.info("Ticket de la caché anterior migrado a JSON para %s", service)
+        self._save_auth_to_cache(service, auth)
+        return auth
     
     def _save_auth_to_cache(self, service, auth):
+        _auth_memory[self._cache_key(service)] = auth
         cache_path = self._get_cache_path(service)
         
         try:
-            with open(cache_path, 'wb') as f:
-                pickle.dump(auth, f)
-            logger.info(f"Autenticación guardada en caché para {service}")
+            # Escritura atómica para que otro worker nunca lea un archivo a medio escribir
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(auth))
+            os.utime(tmp_path, (auth.expiration_epoch, auth.expiration_epoch))
+            os.replace(tmp_path, cache_path)
+            logger.info("Autenticación guardada en caché para %s", service)
         except Exception as e:
-            logger.error(f"Error al guardar autenticación en caché: {str(e)}")
+            logger.error("Error al guardar autenticación en caché: %s", e)
     
+    def _get_client(self):
+        # Cliente SOAP para WSAA compartido por URL: el WSDL se descarga y parsea una sola vez
+        # por proceso
+        client = _wsaa_clients.get(self.wsaa_url)
+        if client is None:
+            with _wsaa_clients_lock:
+                client = _wsaa_clients.get(self.wsaa_url)
+                if client is None:
+                    transport = Transport(session=self.session, timeout=30, cache=get_wsdl_cache())
+                    client = Client(wsdl=f"{self.wsaa_url}?WSDL", transport=transport)
+                    _wsaa_clients[self.wsaa_url] = client
+        return client
+
     def authenticate(self, service="wsfe", force_new=False):
         # Verificar si hay una autenticación válida en caché
         if not force_new:
             cached_auth = self._load_auth_from_cache(service)
             if cached_auth:
                 return cached_auth
-        
+
+        # Un solo loginCms a la vez por ticket
+        with _get_auth_lock(self._cache_key(service)):
+            if not force_new:
+                cached_auth = self._load_auth_from_cache(service)
+                if cached_auth:
+                    return cached_auth
+            return self._request_auth(service)
+
+    async def authenticate_async(self, service="wsfe", force_new=False):
+        # El acierto en memoria se resuelve sin salir del event loop
+        if not force_new:
+            auth = _auth_memory.get(self._cache_key(service))
+            if auth is not None and auth.is_valid:
+                return auth
+
+        # La firma y el loginCms bloquean: van a un hilo para no frenar el loop
+        return await asyncio.to_thread(self.authenticate, service, force_new)
+
+    def _request_auth(self, service):
         try:
-            logger.info(f"Iniciando autenticación para servicio {service}")
+            logger.info("Iniciando autenticación para servicio %s", service)
             
             # Leer certificado y clave
             cert_content, key_content = read_cert_and_key(self.cert_path, self.key_path)
             
-            # Carga la configuración de OpenSSL que habilita proveedores legacy
-            openssl_conf_path = os.path.join(BASE_DIR, 'src', 'config', 'openssl.cnf')
-            libcrypto_found = False
-            for lib_name in ("libcrypto.so.3", "libcrypto.so.1.1"):
-                try:
-                    libcrypto = ctypes.CDLL(lib_name)
-                    libcrypto.OPENSSL_config(openssl_conf_path.encode('utf-8'))
-                    libcrypto_found = True
-                    break
-                except OSError:
-                    logger.debug(f"No se encontró la librería '{lib_name}'. Intentando con la siguiente.")
-                    continue
+            _init_openssl_once()
             
             # Crear TRA
             tra_xml = create_tra_xml(service, TOKEN_TTL)
@@ -109,11 +267,7 @@ class AfipAuthenticator:
             # Firmar TRA
             signed_tra = sign_data(tra_xml, cert_content, key_content, detached=False)
             
-            # Crear cliente SOAP para WSAA
-            session = Session()
-            session.verify = False
-            transport = Transport(session=session, timeout=30) 
-            client = Client(wsdl=f"{self.wsaa_url}?WSDL", transport=transport)
+            client = self._get_client()
             
             # Enviar TRA y obtener respuesta
             logger.debug("Enviando solicitud de autenticación a AFIP")
@@ -127,10 +281,10 @@ class AfipAuthenticator:
                 token=auth_data['token'],
                 sign=auth_data['sign'],
                 cuit=self.cuit,
-                expiration=auth_data['expiration']
+                expiration_epoch=int(auth_data['expiration'].timestamp())
             )
             
-            logger.info(f"Autenticación exitosa")
+            logger.info("Autenticación exitosa")
             
             # Guardar en caché
             self._save_auth_to_cache(service, auth)
@@ -139,14 +293,14 @@ class AfipAuthenticator:
         
         except requests.exceptions.ConnectTimeout:
             logger.error("Error de red: Timeout al intentar conectar con el servidor de AFIP (WSAA). Verifica la conectividad de red del contenedor.")
-            raise Exception("Error de red: No se pudo conectar con AFIP (WSAA).")
+            raise AfipTimeoutError("Error de red: No se pudo conectar con AFIP (WSAA).")
         except requests.exceptions.ReadTimeout:
             logger.error("Error de red: Timeout de lectura esperando respuesta de AFIP (WSAA). El servidor podría estar lento.")
-            raise Exception("Error de red: AFIP (WSAA) no respondió a tiempo.")
+            raise AfipTimeoutError("Error de red: AFIP (WSAA) no respondió a tiempo.")
         except Exception as e:
             if "Firma inválida" in str(e):
-                 logger.error(f"Error en autenticación")
+                 logger.error("Error en autenticación")
                  raise
             else:
-                logger.error(f"Error inesperado durante la autenticación")
-                raise Exception(f"Firma inválida o algoritmo no soportado")
\ No newline at end of file
+                logger.exception("Error inesperado durante la autenticación")
+                raise AfipError("Firma inválida o algoritmo no soportado") from e
\ No newline at end of file
@@ -1,26 +1,60 @@
+import asyncio
+from types import MappingProxyType
 from src.services.wsaa import WSAAService
 from src.services.wsfe import WSFEService
-from src.core.models import InvoiceRequest, InvoiceResponse
+from src.core.models import InvoiceRequest, InvoiceResponse, VatDetail
 from src.utils.logger import setup_logger
 from src.config import Config
 
 logger = setup_logger(__name__)
 
+# Mapeo de tasas de IVA a sus IDs correspondientes en AFIP
+VAT_RATE_TO_ID = MappingProxyType({
+    21: 5,
+    10.5: 4,
+    27: 6,
+})
+
+# Factor total/neto por tasa (1 + tasa/100), calculado una sola vez
+VAT_RATE_FACTOR = MappingProxyType({rate: 1 + (rate / 100) for rate in VAT_RATE_TO_ID})
+
 class AfipClient:
     
-    def __init__(self, cuit=None, cert_path=None, key_path=None, testing=None):
-        # Inicializar servicios
-        self.wsaa = WSAAService(cuit, cert_path, key_path, testing)
-        self.wsfe = WSFEService(cuit, cert_path, key_path, testing)
+    __slots__ = ('cuit', 'testing', '_cert_path', '_key_path', '_session', '_wsaa', '_wsfe')
+    
+    def __init__(self, cuit=None, cert_path=None, key_path=None, testing=None, session=None):
+        # Los servicios se crean recién al usarse (session: requests.Session compartida)
+        self._cert_path = cert_path
+        self._key_path = key_path
+        self._session = session
+        self._wsaa = None
+        self._wsfe = None
         
         # Guardar referencias
-        self.cuit = cuit or self.wsaa.authenticator.cuit
-        self.testing = testing if testing is not None else self.wsaa.authenticator.testing
+        self.cuit = cuit or Config.AFIP_CONFIG["cuit"]
+        self.testing = testing if testing is not None else Config.AFIP_CONFIG["testing"]
+    
+    @property
+    def wsaa(self):
+        if self._wsaa is None:
+            self._wsaa = WSAAService(self.cuit, self._cert_path, self._key_path, self.testing, session=self._session)
+        return self._wsaa
+    
+    @property
+    def wsfe(self):
+        if self._wsfe is None:
+            self._wsfe = WSFEService(self.cuit, self._cert_path, self._key_path, self.testing, session=self._session)
+        return self._wsfe
     
     def authenticate(self, service="wsfe", force_new=False):
         # Autenticar servicios
         return self.wsaa.get_auth_dict(service, force_new)
     
+    async def authenticate_many(self, services, force_new=False):
+        # Autentica varios servicios en paralelo; devuelve {servicio: AfipAuth}
+        auths = await asyncio.gather(*(self.wsaa.get_auth_async(service, force_new) for service in services))
+        return dict(zip(services, auths))
+    
     def get_last_invoice_number(self, sales_point=None, voucher_type=1):
         # Obtiene ultimo numero comprobante
         if sales_point is None:
@@ -48,100 +82,74 @@ class AfipClient:
         # Tipos de monedas
         return self.wsfe.get_currency_types()
     
-    def create_invoice(self, invoice_data):
-        # Convertir a modelo si es un diccionario
-        if isinstance(invoice_data, dict):
-            invoice_request = InvoiceRequest(**invoice_data)
-        else:
-            invoice_request = invoice_data
-        
-        # Crear factura
+    def create_invoice(self, invoice_request):
+        # Crear factura a partir de un InvoiceRequest
         return self.wsfe.create_invoice(invoice_request)
     
+    def create_invoice_from_dict(self, invoice_data):
+        # Crear factura a partir de un diccionario con los campos de InvoiceRequest
+        return self.wsfe.create_invoice(InvoiceRequest(**invoice_data))
+    
+    def create_invoices_batch(self, invoices_data):
+        # Convertir a modelo los elementos que sean diccionarios
+        invoice_requests = [
+            InvoiceRequest(**invoice_data) if isinstance(invoice_data, dict) else invoice_data
+            for invoice_data in invoices_data
+        ]
+        
+        # Crear facturas en lote
+        return self.wsfe.create_invoices_batch(invoice_requests)
+    
     def check_invoice(self, sales_point, voucher_type, voucher_number):
         # Consultar factura
         return self.wsfe.check_invoice(sales_point, voucher_type, voucher_number)
     
     def create_invoice_a(self, client_cuit, net_amount, vat_rate=21, **kwargs):
-        # Mapeo de tasas de IVA a sus IDs correspondientes en AFIP
-        VAT_RATE_TO_ID = {
-            21: 5,
-            10.5: 4,
-            27: 6,
-        }
+        vat_type_id = VAT_RATE_TO_ID.get(vat_rate)
+        if vat_type_id is None:
+            raise ValueError(f"Tasa de IVA no soportada: {vat_rate}")
 
         # Calcular importes
         vat_amount = net_amount * (vat_rate / 100)
         total_amount = net_amount + vat_amount
-        
-        vat_type_id = VAT_RATE_TO_ID.get(vat_rate)
-        if vat_type_id is None:
-            raise ValueError(f"Tasa de IVA no soportada: {vat_rate}")
             
-        # Preparar datos de la factura
-        invoice_data = {
-            'sales_point': kwargs.get('sales_point', Config.DEFAULT_SALES_POINT),
-            'voucher_type': 1,  # Factura A
-            'concept': kwargs.get('concept', 1),
-            'doc_type': 80,  # CUIT
-            'doc_number': client_cuit,
-            'total_amount': total_amount,
-            'net_amount': net_amount,
-            'vat_amount': vat_amount,
-            'vat_details': [
-                {
-                    'Id': vat_type_id,
-                    'BaseImp': net_amount,
-                    'Importe': vat_amount
-                }
-            ]
-        }
-        
-        # Agregar argumentos adicionales
-        for key, value in kwargs.items():
-            if key not in invoice_data:
-                invoice_data[key] = value
+        # Construir la solicitud (los kwargs restantes son campos opcionales de InvoiceRequest)
+        invoice_request = InvoiceRequest(
+            sales_point=kwargs.pop('sales_point', Config.DEFAULT_SALES_POINT),
+            voucher_type=1,  # Factura A
+            concept=kwargs.pop('concept', 1),
+            doc_type=80,  # CUIT
+            doc_number=client_cuit,
+            total_amount=total_amount,
+            net_amount=net_amount,
+            vat_amount=vat_amount,
+            vat_details=[VatDetail(Id=vat_type_id, BaseImp=net_amount, Importe=vat_amount)],
+            **kwargs
+        )
                 
-        return self.create_invoice(invoice_data)
+        return self.create_invoice(invoice_request)
     
     def create_invoice_b(self, client_doc_type, client_doc_number, total_amount, vat_rate=21, **kwargs):
-        # Mapeo de tasas de IVA a sus IDs correspondientes en AFIP
-        VAT_RATE_TO_ID = {
-            21: 5,
-            10.5: 4,
-            27: 6,
-        }
-        
-        # Calcular importes
-        net_amount = total_amount / (1 + (vat_rate / 100))
-        vat_amount = total_amount - net_amount
-        
         vat_type_id = VAT_RATE_TO_ID.get(vat_rate)
         if vat_type_id is None:
             raise ValueError(f"Tasa de IVA no soportada: {vat_rate}")
-            
-        # Preparar datos de la factura
-        invoice_data = {
-            'sales_point': kwargs.get('sales_point', Config.DEFAULT_SALES_POINT),
-            'voucher_type': 6,  # Factura B
-            'concept': kwargs.get('concept', 1),
-            'doc_type': client_doc_type,
-            'doc_number': client_doc_number,
-            'total_amount': total_amount,
-            'net_amount': net_amount,
-            'vat_amount': vat_amount,
-            'vat_details': [
-                {
-                    'Id': vat_type_id,
-                    'BaseImp': net_amount,
-                    'Importe': vat_amount
-                }
-            ]
-        }
         
-        # Agregar argumentos adicionales
-        for key, value in kwargs.items():
-            if key not in invoice_data:
-                invoice_data[key] = value
+        # Calcular importes
+        net_amount = total_amount / VAT_RATE_FACTOR[vat_rate]
+        vat_amount = total_amount - net_amount
+            
+        # Construir la solicitud (los kwargs restantes son campos opcionales de InvoiceRequest)
+        invoice_request = InvoiceRequest(
+            sales_point=kwargs.pop('sales_point', Config.DEFAULT_SALES_POINT),
+            voucher_type=6,  # Factura B
+            concept=kwargs.pop('concept', 1),
+            doc_type=client_doc_type,
+            doc_number=client_doc_number,
+            total_amount=total_amount,
+            net_amount=net_amount,
+            vat_amount=vat_amount,
+            vat_details=[VatDetail(Id=vat_type_id, BaseImp=net_amount, Importe=vat_amount)],
+            **kwargs
+        )
                 
-        return self.create_invoice(invoice_data)
\ No newline at end of file
+        return self.create_invoice(invoice_request)
\ No newline at end of file
@@ -0,0 +1,6 @@
+class AfipError(Exception):
+    """Error devuelto por los web services de AFIP (WSAA / WSFE)"""
+
+
+class AfipTimeoutError(AfipError):
+    """AFIP no respondió a tiempo o no se pudo conectar"""
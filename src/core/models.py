@@ -1,20 +1,46 @@
+import time
+from dataclasses import dataclass
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Union
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, AliasChoices
+
+# Formatos de fecha aceptados además de AAAAMMDD
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+
+# Días por mes (el 29 de febrero se valida aparte)
+_DAYS_IN_MONTH = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def _compact_date(year, month, day):
+    # Une las partes en AAAAMMDD si forman una fecha válida; None si no
+    if not (year.isdigit() and month.isdigit() and day.isdigit()):
+        return None
+    y, m, d = int(year), int(month), int(day)
+    if not (y and 1 <= m <= 12 and 1 <= d <= _DAYS_IN_MONTH[m]):
+        return None
+    if m == 2 and d == 29 and not (y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)):
+        return None
+    return year + month + day
+
+# Los alias en minúscula permiten validar directamente los esquemas de la API
+# (VatDetailSchema / TributeDetailSchema) con from_attributes=True
 
 class VatDetail(BaseModel):
     """Detalle de IVA"""
-    Id: int = Field(..., description="ID del tipo de IVA (5: 21%, 4: 10.5%, etc.)")
-    BaseImp: float = Field(..., description="Base imponible")
-    Importe: float = Field(..., description="Importe del IVA")
+    model_config = ConfigDict(frozen=True)
+    
+    Id: int = Field(..., validation_alias=AliasChoices("Id", "id"), description="ID del tipo de IVA (5: 21%, 4: 10.5%, etc.)")
+    BaseImp: float = Field(..., validation_alias=AliasChoices("BaseImp", "base_imp"), description="Base imponible")
+    Importe: float = Field(..., validation_alias=AliasChoices("Importe", "importe"), description="Importe del IVA")
 
 class TributeDetail(BaseModel):
     """Detalle de tributo"""
-    Id: int = Field(..., description="ID del tipo de tributo")
-    Desc: str = Field(..., description="Descripción del tributo")
-    BaseImp: float = Field(..., description="Base imponible")
-    Alic: float = Field(..., description="Alícuota")
-    Importe: float = Field(..., description="Importe del tributo")
+    model_config = ConfigDict(frozen=True)
+    
+    Id: int = Field(..., validation_alias=AliasChoices("Id", "id"), description="ID del tipo de tributo")
+    Desc: str = Field(..., validation_alias=AliasChoices("Desc", "desc"), description="Descripción del tributo")
+    BaseImp: float = Field(..., validation_alias=AliasChoices("BaseImp", "base_imp"), description="Base imponible")
+    Alic: float = Field(..., validation_alias=AliasChoices("Alic", "alic"), description="Alícuota")
+    Importe: float = Field(..., validation_alias=AliasChoices("Importe", "importe"), description="Importe del tributo")
 
 class InvoiceRequest(BaseModel):
     """Datos para la solicitud de factura"""
@@ -39,7 +65,10 @@ class InvoiceRequest(BaseModel):
     condicion_iva_receptor_id: Optional[int] = None
     can_mis_mon_ext: str = "N"
     
-    @validator('service_start_date', 'service_end_date', 'payment_due_date', pre=True)
+    model_config = ConfigDict(extra='ignore')
+    
+    @field_validator('service_start_date', 'service_end_date', 'payment_due_date', mode='before')
+    @classmethod
     def format_date(cls, v):
         if v is None:
             return None
@@ -48,10 +77,22 @@ class InvoiceRequest(BaseModel):
             return v.strftime("%Y%m%d")
         
         if isinstance(v, str):
-            if len(v) == 8 and v.isdigit():
-                return v
+            # Caso habitual: la fecha se valida y arma por posición, sin pasar por strptime
+            compact = None
+            if len(v) == 8:
+                compact = _compact_date(v[:4], v[4:6], v[6:])
+                if compact is None and v.isdigit():
+                    raise ValueError(f"Fecha inválida: {v}")
+            elif len(v) == 10:
+                if v[4] == "-" and v[7] == "-":
+                    compact = _compact_date(v[:4], v[5:7], v[8:])
+                elif v[2] == v[5] and v[2] in "/-":
+                    compact = _compact_date(v[6:], v[3:5], v[:2])
+            if compact is not None:
+                return compact
             
-            for fmt in ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"]:
+            # Fechas sin ceros a la izquierda (ej. 5/1/2024)
+            for fmt in _DATE_FORMATS:
                 try:
                     return datetime.strptime(v, fmt).strftime("%Y%m%d")
                 except ValueError:
@@ -67,7 +108,7 @@ class InvoiceResponse(BaseModel):
     cae_expiration: str = Field(..., description="Fecha de vencimiento del CAE")
     voucher_number: int = Field(..., description="Número de comprobante")
     voucher_date: str = Field(..., description="Fecha del comprobante")
-    status: str = Field("A", description="Estado (A: Aprobado)")
+    status: str = Field("A", description="Estado (A: Aprobado, R: Rechazado, E: Error de AFIP, I: Sin respuesta)")
     observations: Optional[List[str]] = Field(None, description="Observaciones")
     errors: Optional[List[str]] = Field(None, description="Errores")
     
@@ -75,13 +116,15 @@ class InvoiceResponse(BaseModel):
     def is_approved(self):
         return self.status == "A" and self.cae and not self.errors
 
-class AfipAuth(BaseModel):
+@dataclass(slots=True, frozen=True)
+class AfipAuth:
     """Datos de autenticación para AFIP"""
     token: str
     sign: str
     cuit: str
-    expiration: datetime
+    expiration_epoch: int
     
     @property
     def is_valid(self):
-        return datetime.now() < self.expiration
\ No newline at end of file
+        # Margen de 60 s para no usar un ticket a punto de vencer
+        return time.time() < self.expiration_epoch - 60
\ No newline at end of file
@@ -1,24 +1,110 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import orjson
+from decimal import Decimal
+from pydantic import BaseModel
+from sqlalchemy import inspect, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import DeclarativeBase
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-connect_args = {}
-if "sslmode" not in str(DATABASE_URL):
-     connect_args = {"sslmode": "require"}
+# asyncpg no entiende "sslmode": se traduce al argumento "ssl" del driver
+url = make_url(DATABASE_URL)
+connect_args = {"ssl": url.query.get("sslmode", "require")}
+url = url.difference_update_query(["sslmode"]).set(drivername="postgresql+asyncpg")
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+def _json_default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Tipo no serializable a JSON: {type(value)}")
 
-def get_db():
-    db = SessionLocal()
-    try:
+def _json_serializer(value):
+    return orjson.dumps(value, default=_json_default).decode()
+
+engine = create_async_engine(
+    url,
+    connect_args=connect_args,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "40")),
+    # Reciclar antes que los timeouts de inactividad típicos del proxy/servidor; con eso
+    # el pre-ping por checkout se puede apagar (DB_POOL_PRE_PING=0) donde la red es estable
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "1").lower() not in ("0", "false", "no"),
+    # Caché de SQL compilado compartida entre requests (las consultas de las rutas son fijas)
+    query_cache_size=int(os.getenv("DB_QUERY_CACHE_SIZE", "1200")),
+    # Columnas JSONB codificadas con orjson (acepta Decimal y modelos pydantic)
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads
+)
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+class Base(DeclarativeBase):
+    pass
+
+class SessionManager:
+    """Contexto de sesión: hace rollback si hubo un error y siempre devuelve la conexión al pool"""
+
+    def __init__(self):
+        self.db = None
+
+    async def __aenter__(self):
+        self.db = SessionLocal()
+        return self.db
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is not None:
+                await self.db.rollback()
+        finally:
+            await self.db.close()
+
+async def get_db():
+    async with SessionManager() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+def create_missing_indexes(connection):
+    """Crea los índices declarados que falten en tablas ya existentes (create_all no los agrega)"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+# Índices de una sola columna ya cubiertos por los compuestos de Factura o por la clave primaria
+_OBSOLETE_INDEXES = (
+    "ix_facturas_id",
+    "ix_parametros_afip_id",
+    "ix_facturas_tipo_cbte",
+    "ix_facturas_punto_vta",
+    "ix_facturas_numero",
+    "ix_facturas_viaje_id",
+)
+
+def drop_obsolete_indexes(connection):
+    """Elimina de tablas ya existentes los índices que el modelo dejó de declarar"""
+    if connection.dialect.name != "postgresql":
+        return
+    for name in _OBSOLETE_INDEXES:
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+def upgrade_json_columns(connection):
+    """Convierte a JSONB las columnas JSON que en tablas ya existentes siguen siendo TEXT"""
+    if connection.dialect.name != "postgresql":
+        return
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        actuales = {c["name"]: c["type"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            declarado = getattr(column.type, "impl", column.type)
+            if isinstance(declarado, JSONB) and isinstance(actuales.get(column.name), Text):
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+                    f"TYPE JSONB USING NULLIF({column.name}, '')::jsonb"
+                )
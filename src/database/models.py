@@ -1,16 +1,26 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Numeric, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Numeric, Float, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 from src.database.database import Base
 
+class JsonEncoded(TypeDecorator):
+    """Columna JSONB (el engine la serializa con orjson); los valores vacíos se guardan como NULL"""
+    impl = JSONB(none_as_null=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return value or None
+
 class Factura(Base):
     __tablename__ = "facturas"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # Datos del comprobante
-    tipo_cbte = Column(Integer, nullable=False, index=True)
-    punto_vta = Column(Integer, nullable=False, index=True)
-    numero = Column(Integer, nullable=False, index=True)
+    tipo_cbte = Column(Integer, nullable=False)
+    punto_vta = Column(Integer, nullable=False)
+    numero = Column(Integer, nullable=False)
     fecha_cbte = Column(String(8), nullable=False)
     concepto = Column(Integer, nullable=False)
     
@@ -37,19 +47,19 @@ class Factura(Base):
     
     # Estado
     estado = Column(String(1), default="A")
-    observaciones = Column(Text, nullable=True)
+    observaciones = Column(JsonEncoded, nullable=True)
     descripcion = Column(Text, nullable=True)
     
     # Referencias
-    viaje_id = Column(Integer, nullable=True, index=True)
+    viaje_id = Column(Integer, nullable=True)
     
     # Trazabilidad
     fecha_creacion = Column(DateTime, default=datetime.now, nullable=False)
     fecha_actualizacion = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
     # Datos adicionales
-    detalles_iva = Column(Text, nullable=True)
-    detalles_tributos = Column(Text, nullable=True)
+    detalles_iva = Column(JsonEncoded, nullable=True)
+    detalles_tributos = Column(JsonEncoded, nullable=True)
     moneda = Column(String(3), default="PES")
     moneda_cotiz = Column(Numeric(10, 6), default=1.0)
     can_mis_mon_ext = Column(String(1), default="N") 
@@ -57,9 +67,18 @@ class Factura(Base):
     pdf_generado = Column(Boolean, default=False)
     pdf_path = Column(String(500), nullable=True)
 
+    # Índices para el listado (filtro por viaje + orden por fecha de creación)
+    # y para ubicar un comprobante por punto de venta, tipo y número; los filtros
+    # solo por viaje_id o punto_vta usan el prefijo de estos índices
+    __table_args__ = (
+        Index("ix_factura_viaje_fecha", viaje_id, fecha_creacion.desc(), id.desc()),
+        Index("ix_factura_fecha", fecha_creacion.desc(), id.desc()),
+        Index("ix_factura_cbte", punto_vta, tipo_cbte, numero),
+    )
+
 class ParametroAFIP(Base):
     __tablename__ = "parametros_afip"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     tipo = Column(String(50), nullable=False, index=True)
     codigo = Column(String(50), nullable=False, index=True)
     descripcion = Column(String(255), nullable=True)
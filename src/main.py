@@ -1,81 +1,199 @@
-import argparse
+import functools
 import sys
 import logging
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from datetime import datetime
-from src.core.client import AfipClient
-from src.services.wsfe import WSFEService
-from src.utils.logger import setup_logger
-from config import Config
+from types import MappingProxyType, SimpleNamespace
 
+# Constantes decimales y tipos de comprobante, creadas una sola vez
+_IVA_21 = Decimal('1.21')
+_CENT = Decimal('0.01')
+_ZERO = Decimal('0')
+TIPO_CBTE_MAP = MappingProxyType({'A': 1, 'B': 6, 'C': 11})
+TIPO_CHOICES = tuple(TIPO_CBTE_MAP)
 
-def parse_arguments():
-    parser = argparse.ArgumentParser(description='Sistema de Facturación Electrónica ARCA')
-    
-    subparsers = parser.add_subparsers(dest='comando', help='Comandos disponibles')
-    
-    # Comando para generar factura
+
+def _importe(valor):
+    # Tipo de --importe: número positivo y finito, redondeado a centavos
+    try:
+        importe = Decimal(valor).quantize(_CENT, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        importe = None
+    if importe is None or not importe.is_finite() or importe <= 0:
+        from argparse import ArgumentTypeError
+        raise ArgumentTypeError(f"importe inválido: {valor!r} (debe ser un número positivo)")
+    return importe
+
+
+# Comandos sin argumentos propios: nombre -> ayuda
+_COMANDOS_SIMPLES = {
+    'tipos-comprobante': 'Listar tipos de comprobantes disponibles',
+    'puntos-venta': 'Listar puntos de venta habilitados',
+    'tipos-documento': 'Listar tipos de documento',
+    'tipos-concepto': 'Listar tipos de conceptos',
+    'tipos-iva': 'Listar tipos de alícuotas de IVA',
+    'estado': 'Verificar el estado de los servidores de AFIP',
+    'regenerar-token': 'Regenerar el token de autenticación con AFIP',
+}
+COMANDOS = ('factura', *_COMANDOS_SIMPLES)
+
+
+# Subcomandos de factura: nombre -> (ayuda, {opción: (tipo, requerida, valores válidos, ayuda)});
+# la misma tabla alimenta a argparse y al camino rápido
+_FACTURA_SUBCOMANDOS = {
+    'generar': ('Generar una nueva factura', {
+        '--tipo': (str, True, TIPO_CHOICES, 'Tipo de factura'),
+        '--punto-venta': (int, True, None, 'Punto de venta'),
+        '--concepto': (int, True, (1, 2, 3), 'Concepto (1: Productos, 2: Servicios, 3: Productos y Servicios)'),
+        '--tipo-doc': (int, True, None, 'Tipo de documento del cliente'),
+        '--nro-doc': (str, True, None, 'Número de documento del cliente'),
+        '--importe': (_importe, True, None, 'Importe total de la factura'),
+        '--fecha': (str, False, None, 'Fecha de la factura (formato: YYYYMMDD)'),
+    }),
+    'consultar': ('Consultar una factura existente', {
+        '--tipo': (str, True, TIPO_CHOICES, 'Tipo de factura'),
+        '--punto-venta': (int, True, None, 'Punto de venta'),
+        '--numero': (int, True, None, 'Número de factura'),
+    }),
+    'ultimo': ('Obtener último número de comprobante', {
+        '--tipo': (str, True, TIPO_CHOICES, 'Tipo de factura'),
+        '--punto-venta': (int, True, None, 'Punto de venta'),
+    }),
+}
+
+
+def _add_factura_parser(subparsers):
+    # Comando para generar, consultar y obtener el último número de factura
     factura_parser = subparsers.add_parser('factura', help='Operaciones con facturas')
     factura_subparsers = factura_parser.add_subparsers(dest='factura_comando')
     
-    # Generar factura
-    generar_parser = factura_subparsers.add_parser('generar', help='Generar una nueva factura')
-    generar_parser.add_argument('--tipo', type=str, required=True, choices=['A', 'B', 'C'], help='Tipo de factura')
-    generar_parser.add_argument('--punto-venta', type=int, required=True, help='Punto de venta')
-    generar_parser.add_argument('--concepto', type=int, required=True, choices=[1, 2, 3], 
-                              help='Concepto (1: Productos, 2: Servicios, 3: Productos y Servicios)')
-    generar_parser.add_argument('--tipo-doc', type=int, required=True, help='Tipo de documento del cliente')
-    generar_parser.add_argument('--nro-doc', type=str, required=True, help='Número de documento del cliente')
-    generar_parser.add_argument('--importe', type=float, required=True, help='Importe total de la factura')
-    generar_parser.add_argument('--fecha', type=str, help='Fecha de la factura (formato: YYYYMMDD)')
-    
-    # Consultar factura
-    consultar_parser = factura_subparsers.add_parser('consultar', help='Consultar una factura existente')
-    consultar_parser.add_argument('--tipo', type=str, required=True, choices=['A', 'B', 'C'], help='Tipo de factura')
-    consultar_parser.add_argument('--punto-venta', type=int, required=True, help='Punto de venta')
-    consultar_parser.add_argument('--numero', type=int, required=True, help='Número de factura')
-    
-    # Último número de comprobante
-    ultimo_parser = factura_subparsers.add_parser('ultimo', help='Obtener último número de comprobante')
-    ultimo_parser.add_argument('--tipo', type=str, required=True, choices=['A', 'B', 'C'], help='Tipo de factura')
-    ultimo_parser.add_argument('--punto-venta', type=int, required=True, help='Punto de venta')
+    for nombre, (ayuda, opciones) in _FACTURA_SUBCOMANDOS.items():
+        sub_parser = factura_subparsers.add_parser(nombre, help=ayuda)
+        for opcion, (tipo, requerida, choices, ayuda_opcion) in opciones.items():
+            sub_parser.add_argument(opcion, type=tipo, required=requerida, choices=choices, help=ayuda_opcion)
+
+
+def _fast_parse(argv):
+    # Camino rápido sin argparse para invocaciones bien formadas; devuelve None para delegar
+    # en argparse (ayuda, errores, abreviaturas o --opcion=valor) y obtener su salida habitual
+    args = {'comando': None, 'produccion': False, 'config': 'config.ini', 'debug': False}
+    it = iter(argv)
+    for arg in it:
+        if arg == '--produccion':
+            args['produccion'] = True
+        elif arg == '--debug':
+            args['debug'] = True
+        elif arg == '--config':
+            args['config'] = next(it, None)
+            if args['config'] is None:
+                return None
+        elif arg in _COMANDOS_SIMPLES:
+            if next(it, None) is not None:
+                return None
+            args['comando'] = arg
+            return SimpleNamespace(**args)
+        elif arg == 'factura':
+            return _fast_parse_factura(it, args)
+        else:
+            return None
+    return None
+
+
+def _fast_parse_factura(it, args):
+    subcomando = next(it, None)
+    if subcomando not in _FACTURA_SUBCOMANDOS:
+        return None
+    opciones = _FACTURA_SUBCOMANDOS[subcomando][1]
     
-    # Consulta de tipos de comprobantes
-    subparsers.add_parser('tipos-comprobante', help='Listar tipos de comprobantes disponibles')
+    valores = {}
+    for opcion in it:
+        spec = opciones.get(opcion)
+        valor = next(it, None)
+        if spec is None or valor is None or opcion in valores:
+            return None
+        tipo, _, choices, _ = spec
+        try:
+            valor = tipo(valor)
+        except Exception:
+            # Valor inválido: argparse lo vuelve a convertir e informa el error de uso
+            return None
+        if choices is not None and valor not in choices:
+            return None
+        valores[opcion] = valor
     
-    # Consulta de puntos de venta
-    subparsers.add_parser('puntos-venta', help='Listar puntos de venta habilitados')
+    for opcion, (_, requerida, _, _) in opciones.items():
+        if opcion not in valores:
+            if requerida:
+                return None
+            valores[opcion] = None
     
-    # Consulta de tipos de documento
-    subparsers.add_parser('tipos-documento', help='Listar tipos de documento')
+    args['comando'] = 'factura'
+    args['factura_comando'] = subcomando
+    args.update((opcion[2:].replace('-', '_'), valor) for opcion, valor in valores.items())
+    return SimpleNamespace(**args)
+
+
+def _sniff_comando(argv):
+    # Primer argumento posicional, si es un comando conocido (el valor de --config no cuenta)
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == '--config':
+            skip = True
+        elif not arg.startswith('-'):
+            return arg if arg in COMANDOS else None
+    return None
+
+
+@functools.cache
+def _build_parser(comando=None):
+    # Con el comando ya identificado solo se arma su subparser; sin él (ayuda general,
+    # comando inválido) se arman todos para que la ayuda y los errores queden completos.
+    # Cada variante se arma una sola vez por proceso (scripts por lotes, pruebas)
+    import argparse
     
-    # Consulta de tipos de conceptos
-    subparsers.add_parser('tipos-concepto', help='Listar tipos de conceptos')
+    parser = argparse.ArgumentParser(description='Sistema de Facturación Electrónica ARCA')
     
-    # Consulta de tipos de alícuotas de IVA
-    subparsers.add_parser('tipos-iva', help='Listar tipos de alícuotas de IVA')
+    subparsers = parser.add_subparsers(dest='comando', help='Comandos disponibles')
     
-    # Consulta de estado de servidores
-    subparsers.add_parser('estado', help='Verificar el estado de los servidores de AFIP')
+    if comando in (None, 'factura'):
+        _add_factura_parser(subparsers)
     
-    # Comando para regenerar el token de autenticación
-    subparsers.add_parser('regenerar-token', help='Regenerar el token de autenticación con AFIP')
+    for nombre, ayuda in _COMANDOS_SIMPLES.items():
+        if comando in (None, nombre):
+            subparsers.add_parser(nombre, help=ayuda)
     
     # Modo de ejecución
     parser.add_argument('--produccion', action='store_true', help='Ejecutar en modo producción (por defecto: homologación)')
     parser.add_argument('--config', type=str, default='config.ini', help='Archivo de configuración')
     parser.add_argument('--debug', action='store_true', help='Activar modo depuración')
     
-    return parser.parse_args()
+    return parser
+
+
+def parse_arguments(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = _fast_parse(argv)
+    if args is None:
+        # argparse (y gettext) se importan solo cuando el camino rápido no alcanza
+        args = _build_parser(_sniff_comando(argv)).parse_args(argv)
+    return args
 
 
 def main():
     args = parse_arguments()
     
+    # Los imports de configuración y logging se pagan recién con argumentos válidos
+    from src.utils.logger import setup_logger
+    from src.utils.param_cache import cached_param, clear_param_cache
+    
     log_level = logging.DEBUG if args.debug else logging.INFO
     logger = setup_logger('facturacion_afip', log_level)
     
     try:
+        from config import Config
         config = Config(args.config)
         entorno = 'produccion' if args.produccion else 'homologacion'
         logger.info(f"Ejecutando en entorno: {entorno}")
@@ -83,14 +201,13 @@ def main():
         logger.error(f"Error al cargar la configuración: {e}")
         sys.exit(1)
     
+    if args.comando is None:
+        logger.error("Comando no reconocido")
+        sys.exit(1)
+    
+    # Cliente y servicio se crean recién cuando el comando los necesita
     try:
-        client = AfipClient(
-            cuit=config.get('cuit'),
-            cert_path=config.get('cert_path'),
-            key_path=config.get('key_path'),
-            production=args.produccion
-        )
-        wsfe = WSFEService(client)
+        client, wsfe = _get_wsfe(config.get('cuit'), config.get('cert_path'), config.get('key_path'), args.produccion)
     except Exception as e:
         logger.error(f"Error al inicializar el cliente AFIP: {e}")
         sys.exit(1)
@@ -99,19 +216,20 @@ def main():
         if args.comando == 'factura':
             procesar_comando_factura(args, wsfe, logger)
         elif args.comando == 'tipos-comprobante':
-            tipos = wsfe.get_tipos_comprobante()
+            tipos = cached_param(f"tipos_comprobante_{entorno}", wsfe.get_tipos_comprobante)
             print_tabla(tipos, ['Id', 'Descripción'])
         elif args.comando == 'puntos-venta':
-            puntos = wsfe.get_puntos_venta()
+            # Los puntos de venta se pueden habilitar en cualquier momento: vencen antes
+            puntos = cached_param(f"puntos_venta_{entorno}_{config.get('cuit')}", wsfe.get_puntos_venta, ttl=3600)
             print_tabla(puntos, ['Punto de Venta', 'Tipo', 'Bloqueado'])
         elif args.comando == 'tipos-documento':
-            tipos = wsfe.get_tipos_documento()
+            tipos = cached_param(f"tipos_documento_{entorno}", wsfe.get_tipos_documento)
             print_tabla(tipos, ['Id', 'Descripción'])
         elif args.comando == 'tipos-concepto':
-            tipos = wsfe.get_tipos_concepto()
+            tipos = cached_param(f"tipos_concepto_{entorno}", wsfe.get_tipos_concepto)
             print_tabla(tipos, ['Id', 'Descripción'])
         elif args.comando == 'tipos-iva':
-            tipos = wsfe.get_tipos_iva()
+            tipos = cached_param(f"tipos_iva_{entorno}", wsfe.get_tipos_iva)
             print_tabla(tipos, ['Id', 'Descripción', 'Alícuota'])
         elif args.comando == 'estado':
             estado = wsfe.get_server_status()
@@ -120,6 +238,7 @@ def main():
             print(f"Estado del servidor DB: {estado['db']}")
         elif args.comando == 'regenerar-token':
             client.auth.authenticate(force=True)
+            clear_param_cache()
             logger.info("Token regenerado con éxito")
         else:
             logger.error("Comando no reconocido")
@@ -129,10 +248,25 @@ def main():
         sys.exit(1)
 
 
+@functools.cache
+def _get_wsfe(cuit, cert_path, key_path, produccion):
+    # Se construye una sola vez por configuración, y solo si un comando lo usa;
+    # la cadena de imports SOAP/TLS se paga recién acá
+    from src.core.client import AfipClient
+    from src.services.wsfe import WSFEService
+    
+    client = AfipClient(
+        cuit=cuit,
+        cert_path=cert_path,
+        key_path=key_path,
+        production=produccion
+    )
+    return client, WSFEService(client)
+
+
 def procesar_comando_factura(args, wsfe, logger):
     if args.factura_comando == 'generar':
-        tipo_cbte_map = {'A': 1, 'B': 6, 'C': 11}
-        tipo_comprobante = tipo_cbte_map.get(args.tipo)
+        tipo_comprobante = TIPO_CBTE_MAP.get(args.tipo)
         
         if not tipo_comprobante:
             logger.error(f"Tipo de factura inválido: {args.tipo}")
@@ -147,15 +281,16 @@ def procesar_comando_factura(args, wsfe, logger):
         else:
             fecha = datetime.now()
         
-        importe_total = Decimal(str(args.importe))
+        # El importe llega como Decimal ya redondeado a centavos: sin pasar por float
+        importe_total = args.importe
         
         imp_neto = importe_total
-        imp_iva = Decimal('0')
+        imp_iva = _ZERO
         
         ali_iva = []
         
         if args.tipo == 'A':
-            imp_neto = (importe_total / Decimal('1.21')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            imp_neto = (importe_total / _IVA_21).quantize(_CENT, rounding=ROUND_HALF_UP)
             imp_iva = importe_total - imp_neto
             
             ali_iva = [{
@@ -164,21 +299,23 @@ def procesar_comando_factura(args, wsfe, logger):
                 'importe': float(imp_iva)
             }]
 
+        fecha_str = fecha.strftime('%Y%m%d')
+        
         factura_data = {
             'tipo_cbte': tipo_comprobante,
             'punto_vta': args.punto_venta,
             'concepto': args.concepto,
             'tipo_doc': args.tipo_doc,
             'nro_doc': args.nro_doc,
-            'fecha_cbte': fecha.strftime('%Y%m%d'),
+            'fecha_cbte': fecha_str,
             'imp_total': float(importe_total),
             'imp_neto': float(imp_neto),
             'imp_iva': float(imp_iva),
             'imp_trib': 0,
             'imp_op_ex': 0,
-            'fecha_serv_desde': fecha.strftime('%Y%m%d'),
-            'fecha_serv_hasta': fecha.strftime('%Y%m%d'),
-            'fecha_venc_pago': fecha.strftime('%Y%m%d'),
+            'fecha_serv_desde': fecha_str,
+            'fecha_serv_hasta': fecha_str,
+            'fecha_venc_pago': fecha_str,
             'moneda_id': 'PES',
             'moneda_ctz': 1,
             'iva': ali_iva 
@@ -195,11 +332,7 @@ def procesar_comando_factura(args, wsfe, logger):
             logger.error(f"Error de conexión/proceso: {e}")
     
     elif args.factura_comando == 'consultar':
-        tipo_comprobante = {
-            'A': 1,
-            'B': 6,
-            'C': 11
-        }[args.tipo]
+        tipo_comprobante = TIPO_CBTE_MAP[args.tipo]
         
         result = wsfe.consultar_factura(tipo_comprobante, args.punto_venta, args.numero)
         
@@ -211,11 +344,7 @@ def procesar_comando_factura(args, wsfe, logger):
             print(f"\nError al consultar la factura: {result['error']}")
     
     elif args.factura_comando == 'ultimo':
-        tipo_comprobante = {
-            'A': 1,
-            'B': 6,
-            'C': 11
-        }[args.tipo]
+        tipo_comprobante = TIPO_CBTE_MAP[args.tipo]
         
         result = wsfe.get_ultimo_comprobante(tipo_comprobante, args.punto_venta)
         
@@ -234,31 +363,24 @@ def print_tabla(data, headers):
         print("No hay datos para mostrar")
         return
     
-    # Determinar el ancho de cada columna
-    widths = [max(len(str(item[i])) for item in data) for i in range(len(headers))]
-    header_widths = [len(h) for h in headers]
-    
-    for i in range(len(widths)):
-        widths[i] = max(widths[i], header_widths[i]) + 2
-    
-    # Imprimir encabezados
-    header_line = '|'
-    for i, header in enumerate(headers):
-        header_line += f" {header.ljust(widths[i] - 1)}|"
-    print(header_line)
-    
-    # Imprimir separador
-    separator = '+'
-    for width in widths:
-        separator += '-' * width + '+'
-    print(separator)
-    
-    # Imprimir datos
+    # Una sola pasada: cada celda se convierte a str una vez y se actualiza el ancho
+    ncols = len(headers)
+    widths = [len(h) for h in headers]
+    str_rows = []
     for row in data:
-        line = '|'
-        for i, item in enumerate(row):
-            line += f" {str(item).ljust(widths[i] - 1)}|"
-        print(line)
+        cells = [str(row[i]) for i in range(ncols)]
+        for i, cell in enumerate(cells):
+            if len(cell) > widths[i]:
+                widths[i] = len(cell)
+        str_rows.append(cells)
+    widths = [w + 2 for w in widths]
+    
+    # Plantilla de fila armada una vez; encabezados, separador y datos se escriben de una vez
+    row_fmt = '|' + ''.join(f" {{:<{width - 1}}}|" for width in widths)
+    lines = [row_fmt.format(*headers)]
+    lines.append('+' + ''.join('-' * width + '+' for width in widths))
+    lines.extend(row_fmt.format(*cells) for cells in str_rows)
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,31 @@
-from typing import Optional, List, Dict, Any
+import re
+from typing import Annotated, Optional, List, Dict, Any
+from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
-from pydantic import BaseModel, Field, validator, model_validator
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, StringConstraints, model_validator
+
+# AAAAMMDD, AAAA-MM-DD, AAAA/MM/DD o DD/MM/AAAA, DD-MM-AAAA en una sola pasada
+_DATE_RE = re.compile(r"(\d{4})[-/]?(\d{2})[-/]?(\d{2})|(\d{2})[-/](\d{2})[-/](\d{4})")
+
+def _normalize_date(v):
+    # Lleva la fecha a AAAAMMDD; el rango de mes y día lo valida InvoiceRequest
+    if not v: return None
+    if isinstance(v, datetime): return v.strftime("%Y%m%d")
+    if not isinstance(v, str): return v
+    if len(v) == 8 and v.isdigit(): return v
+    m = _DATE_RE.fullmatch(v)
+    if m is None:
+        raise ValueError(f"Formato de fecha no reconocido: {v}")
+    if m.group(1):
+        return m.group(1) + m.group(2) + m.group(3)
+    return m.group(6) + m.group(5) + m.group(4)
+
+# Diferencia máxima admitida entre el total y la suma de sus componentes
+_TOLERANCIA_TOTAL = Decimal("0.01")
+
+# Fecha en formato AFIP; el validador lo invoca pydantic-core antes de validar el str
+FechaAFIP = Annotated[Optional[str], BeforeValidator(_normalize_date)]
 
 class VatDetailSchema(BaseModel):
     id: int = Field(..., description="ID del tipo de IVA")
@@ -16,15 +40,17 @@ class TributeDetailSchema(BaseModel):
     importe: Decimal = Field(..., description="Importe")
 
 class FacturaRequestSchema(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     viaje_id: Optional[int] = None
     sales_point: int = Field(..., ge=1)
     voucher_type: int = Field(..., description="1: Factura A, 6: Factura B, 11: Factura C")
     concept: int = Field(1, ge=1, le=3)
     doc_type: int = Field(80)
-    doc_number: str = Field(..., min_length=7, max_length=20)
+    doc_number: Annotated[str, StringConstraints(min_length=7, max_length=20)]
     
     condicion_iva_receptor_id: Optional[int] = Field(None, description="Obligatorio por RG 5616. Consultar FEParamGetCondicionIvaReceptor")
-    can_mis_mon_ext: str = Field("N", pattern="^(S|N)$", description="Cancelación Misma Moneda Extranjera")
+    can_mis_mon_ext: Annotated[str, StringConstraints(pattern="^[SN]$")] = Field("N", description="Cancelación Misma Moneda Extranjera")
     description: Optional[str] = Field(None, description="Descripción del ítem o servicio")
 
     # Importes
@@ -39,9 +65,9 @@ class FacturaRequestSchema(BaseModel):
     exempt_amount: Decimal = Field(0, ge=0)
     tributes_amount: Decimal = Field(0, ge=0)
     
-    service_start_date: Optional[str] = None
-    service_end_date: Optional[str] = None
-    payment_due_date: Optional[str] = None
+    service_start_date: FechaAFIP = None
+    service_end_date: FechaAFIP = None
+    payment_due_date: FechaAFIP = None
     
     currency: str = Field("PES")
     currency_rate: Decimal = Field(1.0, gt=0)
@@ -49,32 +75,27 @@ class FacturaRequestSchema(BaseModel):
     vat_details: Optional[List[VatDetailSchema]] = None
     tributes_details: Optional[List[TributeDetailSchema]] = None
     
-    @validator('service_start_date', 'service_end_date', 'payment_due_date', pre=True)
-    def format_date(cls, v):
-        if not v: return None
-        if isinstance(v, datetime): return v.strftime("%Y%m%d")
-        return v.replace("-", "").replace("/", "")
-
     @model_validator(mode='after')
     def validate_total_consistency(self) -> 'FacturaRequestSchema':
         
-        net = self.net_amount or Decimal(0)
-        vat = self.vat_amount or Decimal(0)
-        non_tax = self.non_taxable_amount or Decimal(0)
-        exempt = self.exempt_amount or Decimal(0)
-        tributes = self.tributes_amount or Decimal(0)
+        # Los componentes ya llegan validados como Decimal (requeridos o con default 0)
+        expected_total = (
+            self.net_amount + self.vat_amount + self.non_taxable_amount
+            + self.exempt_amount + self.tributes_amount
+        )
+        diferencia = abs(self.total_amount - expected_total)
         
-        expected_total = net + vat + non_tax + exempt + tributes
-        
-        if abs(self.total_amount - expected_total) > Decimal('0.01'):
+        if diferencia > _TOLERANCIA_TOTAL:
             raise ValueError(
                 f"Total ({self.total_amount}) no coincide con la suma de componentes ({expected_total}). "
-                f"Diferencia: {abs(self.total_amount - expected_total)}"
+                f"Diferencia: {diferencia}"
             )
         
         return self
     
 class FacturaResponseSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     cae: str
     fecha_vto_cae: str
@@ -82,11 +103,10 @@ class FacturaResponseSchema(BaseModel):
     imp_total: float 
     estado: str
     pdf_generado: bool
-    
-    class Config:
-        from_attributes = True
 
 class FacturaListSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     tipo_cbte: int
     punto_vta: int
@@ -97,11 +117,10 @@ class FacturaListSchema(BaseModel):
     nro_doc: str
     estado: str
     fecha_creacion: datetime
-    
-    class Config:
-        from_attributes = True
 
-class ParametroAFIPSchema(BaseModel):
+# Dataclass liviana: se construye en bucles sobre los catálogos de AFIP y orjson la serializa directo
+@dataclass(slots=True, frozen=True)
+class ParametroAFIPSchema:
     tipo: str
     codigo: str
     descripcion: Optional[str]
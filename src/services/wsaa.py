@@ -5,17 +5,21 @@ logger = setup_logger(__name__)
 
 class WSAAService:
     
-    def __init__(self, cuit=None, cert_path=None, key_path=None, testing=None):
+    def __init__(self, cuit=None, cert_path=None, key_path=None, testing=None, session=None):
         self.authenticator = AfipAuthenticator(
             cuit=cuit,
             cert_path=cert_path,
             key_path=key_path,
-            testing=testing
+            testing=testing,
+            session=session
         )
     
     def get_auth(self, service="wsfe", force_new=False):
         return self.authenticator.authenticate(service, force_new)
     
+    async def get_auth_async(self, service="wsfe", force_new=False):
+        return await self.authenticator.authenticate_async(service, force_new)
+    
     def get_auth_dict(self, service="wsfe", force_new=False):
         auth = self.get_auth(service, force_new)
         return {
@@ -1,6 +1,5 @@
 from datetime import datetime
 from decimal import Decimal
-from requests import Session
 from zeep import Client
 from zeep.transports import Transport
 import urllib3
@@ -8,14 +7,19 @@ import urllib3
 from src.config import Config
 from src.services.wsaa import WSAAService
 from src.core.models import InvoiceRequest, InvoiceResponse
+from src.core.exceptions import AfipError, AfipTimeoutError
 from src.utils.logger import setup_logger
 from src.utils.xml_utils import format_wsfe_error
+from src.utils.http import get_shared_session, get_wsdl_cache
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = setup_logger(__name__)
 
 class WSFEService:
+    # Máximo de comprobantes por FECAESolicitar según WSFEv1
+    MAX_BATCH_SIZE = 250
+
     class ParametroMock:
         def __init__(self, id_, desc):
             self.Id = id_
@@ -23,13 +27,16 @@ class WSFEService:
             self.FchDesde = "20200101"
             self.FchHasta = "NULL"
 
-    def __init__(self, cuit=None, cert_path=None, key_path=None, testing=None):
+    def __init__(self, cuit=None, cert_path=None, key_path=None, testing=None, session=None):
         self.wsaa_service = WSAAService(
             cuit=cuit,
             cert_path=cert_path,
             key_path=key_path,
-            testing=testing
+            testing=testing,
+            session=session
         )
+        self.session = session or get_shared_session()
+        self._client = None
         self.testing = testing if testing is not None else self.wsaa_service.authenticator.testing
         self.cuit = cuit or self.wsaa_service.authenticator.cuit
         
@@ -39,10 +46,11 @@ class WSFEService:
             logger.warning("---MODO HOMOLOGACIÓN ACTIVO - No se emitirán facturas reales---")
     
     def _get_client(self):
-        session = Session()
-        session.verify = False 
-        transport = Transport(session=session)
-        return Client(wsdl=f"{self.wsfe_url}?WSDL", transport=transport)
+        # El cliente zeep (WSDL ya parseado) se construye una sola vez por servicio
+        if self._client is None:
+            transport = Transport(session=self.session, cache=get_wsdl_cache())
+            self._client = Client(wsdl=f"{self.wsfe_url}?WSDL", transport=transport)
+        return self._client
     
     def _get_auth(self, force_new=False):
         return self.wsaa_service.get_auth_dict("wsfe", force_new)
@@ -75,7 +83,7 @@ class WSFEService:
             if hasattr(result, 'Errors') and result.Errors:
                 error_msg = format_wsfe_error(result.Errors)
                 logger.error(f"Error al obtener último comprobante: {error_msg}")
-                raise Exception(f"Error de AFIP: {error_msg}")
+                raise AfipError(f"Error de AFIP: {error_msg}")
             
             logger.info(f"Último comprobante: {result.CbteNro}")
             return result.CbteNro
@@ -160,7 +168,7 @@ class WSFEService:
                     return [PtoVentaMock(1)]
 
                 logger.error(f"Error al obtener puntos de venta: {error_msg}")
-                raise Exception(f"Error de AFIP: {error_msg}")
+                raise AfipError(f"Error de AFIP: {error_msg}")
             
             return result.ResultGet.PtoVenta
             
@@ -177,13 +185,114 @@ class WSFEService:
             
             if hasattr(result, 'Errors') and result.Errors:
                 error_msg = format_wsfe_error(result.Errors)
-                raise Exception(f"Error de AFIP: {error_msg}")
+                raise AfipError(f"Error de AFIP: {error_msg}")
             
             return getattr(result.ResultGet, result_key)
         except Exception as e:
             logger.error(f"Error en {method_name}: {str(e)}")
             raise
 
+    def _build_detail(self, invoice_request, voucher_number, current_date):
+        # Estructura del detalle del comprobante
+        detalle = {
+            'Concepto': invoice_request.concept,
+            'DocTipo': invoice_request.doc_type,
+            'DocNro': int(invoice_request.doc_number),
+            'CbteDesde': voucher_number,
+            'CbteHasta': voucher_number,
+            'CbteFch': current_date,
+            'ImpTotal': float(invoice_request.total_amount),
+            'ImpTotConc': float(invoice_request.non_taxable_amount),
+            'ImpNeto': float(invoice_request.net_amount),
+            'ImpOpEx': float(invoice_request.exempt_amount),
+            'ImpIVA': float(invoice_request.vat_amount),
+            'ImpTrib': float(invoice_request.tributes_amount),
+            'MonId': invoice_request.currency,
+            'MonCotiz': float(invoice_request.currency_rate),
+            'CanMisMonExt': invoice_request.can_mis_mon_ext
+        }
+
+        if invoice_request.condicion_iva_receptor_id:
+            detalle['CondicionIVAReceptorId'] = invoice_request.condicion_iva_receptor_id
+
+        # Manejo de Fechas de Servicio
+        if invoice_request.concept in (2, 3):
+            detalle['FchServDesde'] = invoice_request.service_start_date or current_date
+            detalle['FchServHasta'] = invoice_request.service_end_date or current_date
+            detalle['FchVtoPago'] = invoice_request.payment_due_date or current_date
+
+        # IVA
+        if invoice_request.vat_details:
+            detalle['Iva'] = {
+                'AlicIva': [
+                    {
+                        'Id': v.Id,
+                        'BaseImp': float(v.BaseImp),
+                        'Importe': float(v.Importe)
+                    } for v in invoice_request.vat_details
+                ]
+            }
+        
+        # Tributos
+        if invoice_request.tributes_details:
+            detalle['Tributos'] = {
+                'Tributo': [
+                    {
+                        'Id': t.Id,
+                        'Desc': t.Desc,
+                        'BaseImp': float(t.BaseImp),
+                        'Alic': float(t.Alic),
+                        'Importe': float(t.Importe)
+                    } for t in invoice_request.tributes_details
+                ]
+            }
+
+        return detalle
+
+    def _solicitar_cae(self, client, auth, sales_point, voucher_type, detalles):
+        # Armado del Request Completo
+        invoice_data_soap = {
+            'Auth': auth,
+            'FeCAEReq': {
+                'FeCabReq': {
+                    'CantReg': len(detalles),
+                    'PtoVta': sales_point,
+                    'CbteTipo': voucher_type
+                },
+                'FeDetReq': {
+                    'FECAEDetRequest': detalles
+                }
+            }
+        }
+        
+        result = client.service.FECAESolicitar(**invoice_data_soap)
+        
+        # Verificar errores generales
+        if hasattr(result, 'Errors') and result.Errors:
+            error_msg = format_wsfe_error(result.Errors)
+            logger.error(f"Error al crear factura: {error_msg}")
+            raise AfipError(f"Error de AFIP: {error_msg}")
+        
+        return result.FeDetResp.FECAEDetResponse
+
+    def _parse_detail_response(self, detail_response, current_date):
+        # Verificar observaciones
+        observations = None
+        if hasattr(detail_response, 'Observaciones') and detail_response.Observaciones:
+            observations = [f"Code {obs.Code}: {obs.Msg}" for obs in detail_response.Observaciones.Obs]
+            for obs in observations:
+                logger.warning(f"Observación AFIP: {obs}")
+
+        return InvoiceResponse(
+            cae=detail_response.CAE or "",
+            cae_expiration=detail_response.CAEFchVto or "",
+            voucher_number=detail_response.CbteDesde,
+            voucher_date=current_date,
+            status=detail_response.Resultado,
+            observations=observations,
+            errors=[f"Comprobante Rechazado. {observations}"] if detail_response.Resultado == 'R' else None
+        )
+
     def create_invoice(self, invoice_request):
         try:
             client = self._get_client()
@@ -193,108 +302,16 @@ class WSFEService:
             last_voucher = self.get_last_voucher(invoice_request.sales_point, invoice_request.voucher_type)
             current_date = datetime.now().strftime("%Y%m%d")
             
-            # Estructura del detalle del comprobante
-            detalle = {
-                'Concepto': invoice_request.concept,
-                'DocTipo': invoice_request.doc_type,
-                'DocNro': int(invoice_request.doc_number),
-                'CbteDesde': last_voucher + 1,
-                'CbteHasta': last_voucher + 1,
-                'CbteFch': current_date,
-                'ImpTotal': float(invoice_request.total_amount),
-                'ImpTotConc': float(invoice_request.non_taxable_amount),
-                'ImpNeto': float(invoice_request.net_amount),
-                'ImpOpEx': float(invoice_request.exempt_amount),
-                'ImpIVA': float(invoice_request.vat_amount),
-                'ImpTrib': float(invoice_request.tributes_amount),
-                'MonId': invoice_request.currency,
-                'MonCotiz': float(invoice_request.currency_rate),
-                'CanMisMonExt': invoice_request.can_mis_mon_ext
-            }
-
-            if invoice_request.condicion_iva_receptor_id:
-                detalle['CondicionIVAReceptorId'] = invoice_request.condicion_iva_receptor_id
-
-            # Manejo de Fechas de Servicio
-            if invoice_request.concept in (2, 3):
-                detalle['FchServDesde'] = invoice_request.service_start_date or current_date
-                detalle['FchServHasta'] = invoice_request.service_end_date or current_date
-                detalle['FchVtoPago'] = invoice_request.payment_due_date or current_date
-
-            # IVA
-            if invoice_request.vat_details:
-                detalle['Iva'] = {
-                    'AlicIva': [
-                        {
-                            'Id': v.Id,
-                            'BaseImp': float(v.BaseImp),
-                            'Importe': float(v.Importe)
-                        } for v in invoice_request.vat_details
-                    ]
-                }
+            detalle = self._build_detail(invoice_request, last_voucher + 1, current_date)
+            detail_response = self._solicitar_cae(
+                client, auth, invoice_request.sales_point, invoice_request.voucher_type, [detalle]
+            )[0]
             
-            # Tributos
-            if invoice_request.tributes_details:
-                detalle['Tributos'] = {
-                    'Tributo': [
-                        {
-                            'Id': t.Id,
-                            'Desc': t.Desc,
-                            'BaseImp': float(t.BaseImp),
-                            'Alic': float(t.Alic),
-                            'Importe': float(t.Importe)
-                        } for t in invoice_request.tributes_details
-                    ]
-                }
+            invoice_response = self._parse_detail_response(detail_response, current_date)
 
-            # Armado del Request Completo
-            invoice_data_soap = {
-                'Auth': auth,
-                'FeCAEReq': {
-                    'FeCabReq': {
-                        'CantReg': 1,
-                        'PtoVta': invoice_request.sales_point,
-                        'CbteTipo': invoice_request.voucher_type
-                    },
-                    'FeDetReq': {
-                        'FECAEDetRequest': [detalle]
-                    }
-                }
-            }
-            
-            result = client.service.FECAESolicitar(**invoice_data_soap)
-            
-            # Verificar errores generales
-            if hasattr(result, 'Errors') and result.Errors:
-                error_msg = format_wsfe_error(result.Errors)
-                logger.error(f"Error al crear factura: {error_msg}")
-                raise Exception(f"Error de AFIP: {error_msg}")
-            
-            # Verificar respuesta del detalle
-            detail_response = result.FeDetResp.FECAEDetResponse[0]
-            
-            # Verificar observaciones
-            observations = None
-            if hasattr(detail_response, 'Observaciones') and detail_response.Observaciones:
-                observations = [f"Code {obs.Code}: {obs.Msg}" for obs in detail_response.Observaciones.Obs]
-                for obs in observations:
-                    logger.warning(f"Observación AFIP: {obs}")
-            
             # Verificar rechazo
-            if detail_response.Resultado == 'R':
-                error_msg = f"Comprobante Rechazado. {observations}"
-                raise Exception(error_msg)
-
-            # Crear respuesta exitosa
-            invoice_response = InvoiceResponse(
-                cae=detail_response.CAE,
-                cae_expiration=detail_response.CAEFchVto,
-                voucher_number=detail_response.CbteDesde,
-                voucher_date=current_date,
-                status="A",
-                observations=observations,
-                errors=None
-            )
+            if invoice_response.status == 'R':
+                raise AfipError(invoice_response.errors[0])
             
             logger.info(f"Factura creada con CAE: {invoice_response.cae}")
             return invoice_response
@@ -303,6 +320,109 @@ class WSFEService:
             logger.error(f"Error en create_invoice: {str(e)}")
             raise
 
+    def _error_response(self, status, mensaje, current_date):
+        # Respuesta de un comprobante que no obtuvo resultado propio de AFIP
+        return InvoiceResponse(
+            cae="",
+            cae_expiration="",
+            voucher_number=0,
+            voucher_date=current_date,
+            status=status,
+            errors=[mensaje]
+        )
+
+    def create_invoices_batch(self, invoice_requests):
+        # Agrupa por punto de venta y tipo de comprobante (FeCabReq es común a todo el lote)
+        # y envía cada grupo en llamadas de hasta MAX_BATCH_SIZE comprobantes.
+        # Devuelve las respuestas en el mismo orden que las solicitudes; los rechazos
+        # no lanzan excepción sino que vuelven con status "R" y errors.
+        # Un rechazo no consume número, así que los comprobantes siguientes del lote dejan
+        # de ser correlativos y AFIP también los rechaza: esos se reenvían renumerados
+        # hasta que cada uno recibe una respuesta propia.
+        # Si falla una llamada a mitad de un grupo, las respuestas ya obtenidas se conservan
+        # (tienen CAE y consumieron numeración) y el resto del grupo vuelve con status "E"
+        # (AFIP respondió con error: no se autorizaron) o "I" (sin respuesta: estado incierto);
+        # solo se lanza excepción si falla algo antes de enviar el primer comprobante.
+        try:
+            client = self._get_client()
+            auth = self._get_auth()
+        except Exception as e:
+            logger.error(f"Error en create_invoices_batch: {str(e)}")
+            raise
+        
+        current_date = datetime.now().strftime("%Y%m%d")
+        
+        grupos = {}
+        for index, invoice_request in enumerate(invoice_requests):
+            key = (invoice_request.sales_point, invoice_request.voucher_type)
+            grupos.setdefault(key, []).append(index)
+        
+        responses = [None] * len(invoice_requests)
+        for (sales_point, voucher_type), indices in grupos.items():
+            try:
+                self._procesar_grupo(
+                    client, auth, sales_point, voucher_type, indices, invoice_requests, responses, current_date
+                )
+                logger.info(f"Lote de {len(indices)} comprobantes procesado para PV {sales_point}, Tipo {voucher_type}")
+            except Exception as e:
+                # Con Errors generales AFIP no autoriza nada de esa llamada; ante un timeout o
+                # un error de red la llamada pudo haberse procesado y hay que consultar antes de reintentar
+                if isinstance(e, AfipError) and not isinstance(e, AfipTimeoutError):
+                    status, mensaje = "E", f"AFIP no autorizó el comprobante: {str(e)}"
+                else:
+                    status, mensaje = "I", f"Sin respuesta de AFIP, consultar el comprobante antes de reintentar: {str(e)}"
+                
+                sin_respuesta = [i for i in indices if responses[i] is None]
+                logger.error(
+                    f"Error en create_invoices_batch (PV {sales_point}, Tipo {voucher_type}): {str(e)}. "
+                    f"{len(indices) - len(sin_respuesta)} comprobantes con respuesta, {len(sin_respuesta)} sin respuesta"
+                )
+                for i in sin_respuesta:
+                    responses[i] = self._error_response(status, mensaje, current_date)
+        
+        return responses
+
+    def _procesar_grupo(self, client, auth, sales_point, voucher_type, indices, invoice_requests, responses, current_date):
+        # Completa responses[i] a medida que AFIP responde, para no perder lo ya autorizado si
+        # una llamada posterior del grupo falla
+        last_voucher = self.get_last_voucher(sales_point, voucher_type)
+        
+        for offset in range(0, len(indices), self.MAX_BATCH_SIZE):
+            pendientes = indices[offset:offset + self.MAX_BATCH_SIZE]
+            
+            while pendientes:
+                detalles = [
+                    self._build_detail(invoice_requests[i], last_voucher + 1 + n, current_date)
+                    for n, i in enumerate(pendientes)
+                ]
+                detail_responses = self._solicitar_cae(client, auth, sales_point, voucher_type, detalles)
+                
+                # El primer rechazo es propio del comprobante; los posteriores pueden
+                # deberse solo a la numeración y se vuelven a enviar
+                hubo_rechazo = False
+                reenviar = []
+                for i, detail_response in zip(pendientes, detail_responses):
+                    response = self._parse_detail_response(detail_response, current_date)
+                    if response.status == 'R':
+                        if hubo_rechazo:
+                            reenviar.append(i)
+                            continue
+                        hubo_rechazo = True
+                    responses[i] = response
+                
+                # Los rechazados no consumen numeración: resincronizar con AFIP
+                if hubo_rechazo:
+                    last_voucher = self.get_last_voucher(sales_point, voucher_type)
+                else:
+                    last_voucher += len(pendientes)
+                
+                if reenviar:
+                    logger.warning(
+                        f"Reenviando {len(reenviar)} comprobantes renumerados tras un rechazo "
+                        f"(PV {sales_point}, Tipo {voucher_type})"
+                    )
+                pendientes = reenviar
+
     def check_invoice(self, sales_point, voucher_type, voucher_number):
         try:
             client = self._get_client()
@@ -320,7 +440,7 @@ class WSFEService:
             
             if hasattr(result, 'Errors') and result.Errors:
                 error_msg = format_wsfe_error(result.Errors)
-                raise Exception(f"Error de AFIP: {error_msg}")
+                raise AfipError(f"Error de AFIP: {error_msg}")
             
             return result.ResultGet
             
@@ -335,4 +455,18 @@ class WSFEService:
             return client.service.FEParamGetCondicionIvaReceptor(Auth=auth)
         except Exception as e:
             logger.error(f"Error obteniendo condiciones IVA: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def get_currency_rate(self, currency_id):
+        try:
+            client = self._get_client()
+            auth = self._get_auth()
+            result = client.service.FEParamGetCotizacion(Auth=auth, MonId=currency_id)
+            
+            if getattr(result, 'Errors', None):
+                raise AfipError(f"Error AFIP: {result.Errors}")
+            
+            return result.ResultGet
+        except Exception as e:
+            logger.error(f"Error obteniendo cotización: {e}")
+            raise
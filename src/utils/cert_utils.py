@@ -1,5 +1,6 @@
 import os
 from base64 import b64encode
+from functools import lru_cache
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.serialization import pkcs7
 from cryptography import x509
@@ -7,29 +8,37 @@ from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+@lru_cache(maxsize=4)
+def _read_file(path, mtime):
+    with open(path, "rb") as f:
+        return f.read()
+
 def read_cert_and_key(cert_path, key_path):
-    if not os.path.exists(cert_path):
+    # Contenido PEM cacheado mientras los archivos no se modifiquen (un stat por archivo)
+    try:
+        cert_mtime = os.stat(cert_path).st_mtime_ns
+    except FileNotFoundError:
         raise FileNotFoundError(f"Certificado no encontrado: {cert_path}")
-    if not os.path.exists(key_path):
+    try:
+        key_mtime = os.stat(key_path).st_mtime_ns
+    except FileNotFoundError:
         raise FileNotFoundError(f"Clave privada no encontrada: {key_path}")
         
-    with open(cert_path, "rb") as f:
-        cert_data = f.read()
-    with open(key_path, "rb") as f:
-        key_data = f.read()
-        
-    return cert_data, key_data
+    return _read_file(cert_path, cert_mtime), _read_file(key_path, key_mtime)
+
+@lru_cache(maxsize=4)
+def _parse_cert(cert_content):
+    return x509.load_pem_x509_certificate(cert_content)
+
+@lru_cache(maxsize=4)
+def _parse_key(key_content):
+    return serialization.load_pem_private_key(key_content, password=None)
 
 def sign_data(data, cert_content, key_content, detached):
     try:
-        # Cargar certificado
-        cert = x509.load_pem_x509_certificate(cert_content)
-        
-        # Cargar clave privada
-        key = serialization.load_pem_private_key(
-            key_content,
-            password=None
-        )
+        # Cargar certificado y clave privada (parseo cacheado por contenido)
+        cert = _parse_cert(cert_content)
+        key = _parse_key(key_content)
         
         # Configurar opciones de firma
         options = [pkcs7.PKCS7Options.DetachedSignature] if detached else []
@@ -0,0 +1,59 @@
+import os
+import threading
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from zeep.cache import InMemoryCache, SqliteCache
+
+from src.config import Config
+
+_shared_session = None
+_wsdl_cache = None
+_lock = threading.Lock()
+
+# WSDL y XSD de AFIP persistidos en disco: un proceso nuevo (CLI, worker recién levantado)
+# no los vuelve a descargar mientras no venzan
+WSDL_CACHE_PATH = os.getenv("WSDL_CACHE_PATH", os.path.join(Config.BASE_DIR, "cache", "wsdl.db"))
+WSDL_CACHE_TTL = 86400
+
+def create_session(pool_size=20, retries=2):
+    # Sesión con pool keep-alive; Retry por defecto no reintenta POST ya enviados
+    # (solo fallos de conexión), así que es seguro para FECAESolicitar y loginCms
+    session = Session()
+    session.verify = False
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_shared_session():
+    # Sesión HTTP compartida por el proceso para WSAA y WSFE
+    global _shared_session
+    with _lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+def close_shared_session():
+    global _shared_session
+    with _lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
+
+def get_wsdl_cache():
+    # Caché de documentos WSDL compartida por los clientes zeep del proceso;
+    # si el disco no es escribible se usa una en memoria
+    global _wsdl_cache
+    with _lock:
+        if _wsdl_cache is None:
+            try:
+                os.makedirs(os.path.dirname(WSDL_CACHE_PATH), exist_ok=True)
+                _wsdl_cache = SqliteCache(path=WSDL_CACHE_PATH, timeout=WSDL_CACHE_TTL)
+            except Exception:
+                _wsdl_cache = InMemoryCache(timeout=WSDL_CACHE_TTL)
+        return _wsdl_cache
@@ -0,0 +1,57 @@
+import os
+import time
+import orjson
+
+from src.config import Config
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Tablas de parámetros de AFIP persistidas entre ejecuciones de la CLI
+PARAM_CACHE_DIR = os.path.join(Config.BASE_DIR, "cache", "parametros")
+
+
+def cached_param(name, loader, ttl=86400):
+    """Devuelve la tabla `name` desde disco si no venció; si no, la pide con loader() y la guarda"""
+    path = os.path.join(PARAM_CACHE_DIR, f"{name}.json")
+
+    # El mtime del archivo guarda el vencimiento, igual que la caché de tickets WSAA
+    try:
+        if os.stat(path).st_mtime > time.time():
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning("Caché de parámetros '%s' ilegible: %s", name, e)
+
+    data = loader()
+
+    try:
+        payload = orjson.dumps(data)
+        os.makedirs(PARAM_CACHE_DIR, exist_ok=True)
+
+        # Escritura atómica: otra ejecución nunca lee un archivo a medio escribir
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        expiration = time.time() + ttl
+        os.utime(tmp_path, (expiration, expiration))
+        os.replace(tmp_path, path)
+    except (OSError, TypeError) as e:
+        logger.warning("No se pudo guardar la caché de parámetros '%s': %s", name, e)
+
+    return data
+
+
+def clear_param_cache():
+    """Descarta todas las tablas guardadas"""
+    try:
+        names = os.listdir(PARAM_CACHE_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        try:
+            os.remove(os.path.join(PARAM_CACHE_DIR, name))
+        except OSError:
+            pass
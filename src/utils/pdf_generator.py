@@ -1,6 +1,7 @@
 import os
 import logging
-import json
+import base64
+import orjson
 import qrcode
 from io import BytesIO
 from datetime import datetime
@@ -54,8 +55,13 @@ class FacturaPDF:
             'ingresos_brutos': config.get('ingresos_brutos', '20406953425'),
             'logo_path': config.get('logo_path', None)
         }
+
+        # Estilos y logo se preparan una sola vez: la instancia se reutiliza entre requests
+        self.styles = self._crear_estilos()
+        self._logo_bytes = self._leer_logo()
         
-    def generar_pdf(self, factura_data):
+    def generar_pdf(self, factura_data, output=None):
+        # output: buffer en memoria opcional; si no se pasa, el PDF se escribe en output_dir
         try:
             if not isinstance(factura_data, dict):
                 factura_data = factura_data.__dict__
@@ -64,11 +70,12 @@ class FacturaPDF:
                 del factura_data['_sa_instance_state']
 
             tipo_letra = self._get_letra(factura_data['tipo_cbte'])
-            filename = f"{tipo_letra}_{factura_data['punto_vta']:04d}_{factura_data['numero']:08d}.pdf"
-            output_path = os.path.join(self.output_dir, filename)
+            if output is None:
+                filename = f"{tipo_letra}_{factura_data['punto_vta']:04d}_{factura_data['numero']:08d}.pdf"
+                output = os.path.join(self.output_dir, filename)
             
             doc = SimpleDocTemplate(
-                output_path, 
+                output, 
                 pagesize=A4, 
                 leftMargin=1*cm, 
                 rightMargin=1*cm, 
@@ -76,7 +83,6 @@ class FacturaPDF:
                 bottomMargin=1*cm
             )
             
-            self.factura_actual = factura_data
             elements = []
             
             # Encabezado Principal (Empresa + Letra + Datos Factura)
@@ -94,8 +100,8 @@ class FacturaPDF:
             # Totales y Pie
             elements.extend(self._crear_totales_y_pie(factura_data))
             
-            doc.build(elements, onFirstPage=self._agregar_metadata)
-            return output_path
+            doc.build(elements, onFirstPage=lambda canvas, doc: self._agregar_metadata(canvas, factura_data))
+            return output
             
         except Exception as e:
             logger.error(f"Error generando PDF: {e}")
@@ -107,8 +113,8 @@ class FacturaPDF:
         if tipo in [11, 12, 13]: return "C"
         return "X"
 
-    def _agregar_metadata(self, canvas, doc):
-        canvas.setTitle(f"Factura {self.factura_actual.get('numero')}")
+    def _agregar_metadata(self, canvas, data):
+        canvas.setTitle(f"Factura {data.get('numero')}")
         canvas.setAuthor(self.empresa['razon_social'])
 
     def _format_date(self, date_str):
@@ -123,6 +129,9 @@ class FacturaPDF:
         except: return str(date_str)
 
     def _estilos(self):
+        return self.styles
+
+    def _crear_estilos(self):
         styles = getSampleStyleSheet()
         styles.add(ParagraphStyle(name='Small', fontSize=8, leading=10))
         styles.add(ParagraphStyle(name='BoldSmall', fontSize=8, leading=10, fontName='Helvetica-Bold'))
@@ -349,9 +358,7 @@ class FacturaPDF:
                 "codAut": int(data['cae']) if str(data['cae']).isdigit() else 0
             }
             
-            qr_str = json.dumps(qr_dict)
-            import base64
-            qr_b64 = base64.b64encode(qr_str.encode()).decode()
+            qr_b64 = base64.b64encode(orjson.dumps(qr_dict)).decode()
             url_qr = f"https://www.afip.gob.ar/fe/qr/?p={qr_b64}"
             
             qr = qrcode.make(url_qr)
@@ -363,12 +370,23 @@ class FacturaPDF:
             logger.error(f"Error generando QR: {e}")
             return Spacer(1,1)
         
-    def _get_logo(self):
+    def _leer_logo(self):
         if not self.empresa['logo_path'] or not os.path.exists(self.empresa['logo_path']):
             return None
+
+        try:
+            with open(self.empresa['logo_path'], 'rb') as f:
+                return f.read()
+        except Exception as e:
+            logger.error(f"Error al cargar logo: {e}")
+            return None
+
+    def _get_logo(self):
+        if not self._logo_bytes:
+            return None
             
         try:
-            logo = Image(self.empresa['logo_path'])
+            logo = Image(BytesIO(self._logo_bytes))
             logo.drawHeight = 2*cm
             logo.drawWidth = 4*cm
             return logo
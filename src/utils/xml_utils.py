@@ -1,41 +1,40 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import zoneinfo 
 from src.utils.logger import setup_logger
 import xml.etree.ElementTree as ET
 
 logger = setup_logger(__name__)
 
+# Zona horaria de AFIP, resuelta una sola vez
+try:
+    _AFIP_TZ = zoneinfo.ZoneInfo("America/Argentina/Buenos_Aires")
+except Exception:
+    _AFIP_TZ = timezone(timedelta(hours=-3))
+
+# Esqueleto del TRA: solo cambian uniqueId, generationTime, expirationTime y service
+_TRA_TEMPLATE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<loginTicketRequest version="1.0">
+    <header>
+        <uniqueId>%d</uniqueId>
+        <generationTime>%s</generationTime>
+        <expirationTime>%s</expirationTime>
+    </header>
+    <service>%s</service>
+</loginTicketRequest>"""
+
 def create_tra_xml(service, ttl=2400):
     try:
-        try:
-            tz_arg = zoneinfo.ZoneInfo("America/Argentina/Buenos_Aires")
-            now_real = datetime.now(tz_arg)
-        except Exception:
-            timezone_offset = -3.0 
-            tzinfo = datetime.timezone(datetime.timedelta(hours=timezone_offset))
-            now_real = datetime.now(tzinfo)
-
-        now = now_real - timedelta(minutes=10)
+        now = datetime.now(_AFIP_TZ) - timedelta(minutes=10)
         expiration = now + timedelta(seconds=ttl)
         
         # Formato requerido
-        generation_time = now.strftime("%Y-%m-%dT%H:%M:%S")
-        expiration_time = expiration.strftime("%Y-%m-%dT%H:%M:%S")
+        generation_time = now.strftime("%Y-%m-%dT%H:%M:%S").encode()
+        expiration_time = expiration.strftime("%Y-%m-%dT%H:%M:%S").encode()
         
         # ID único
-        unique_id = str(int(now.timestamp()))
+        unique_id = int(now.timestamp())
         
-        xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<loginTicketRequest version="1.0">
-    <header>
-        <uniqueId>{unique_id}</uniqueId>
-        <generationTime>{generation_time}</generationTime>
-        <expirationTime>{expiration_time}</expirationTime>
-    </header>
-    <service>{service}</service>
-</loginTicketRequest>"""
-
-        return xml.strip()
+        return _TRA_TEMPLATE % (unique_id, generation_time, expiration_time, service.encode())
 
     except Exception as e:
         logger.error(f"Error al crear XML TRA: {str(e)}")